@@ -20,6 +20,7 @@ class Api:
         self.current_labware_depth = None
         self.folder_for_this_protocol = 'default_folder'
         self.protocol_flags = {'take_pic': 'True', 'folder': 'Protocol Pictures', 'protocol_folder': f'{self.folder_for_this_protocol}'}
+        self.webapp_session = requests.Session() # Keeps the connection to the webapp open between pictures instead of opening one per request
 
     def set_washing_positions(self, clean_water, wash_water, waste_water):
         self.coordinator.set_washing_positions(clean_water, wash_water, waste_water)
@@ -47,6 +48,13 @@ class Api:
         self.coordinator.set_amount_wanted(volume)
         self.coordinator.dispense_to(volume, to)
 
+    def batch(self):
+        return self.coordinator.batch()
+
+    def aspirate_dispense_series(self, volume, source, destinations):
+        self.coordinator.set_amount_wanted(volume)
+        return self.coordinator.aspirate_dispense_series(volume, source, destinations)
+
     def open_lid(self):
         self.coordinator.open_lid()
 
@@ -68,6 +76,9 @@ class Api:
     def set_block_temp(self, target_temp, holding_time_in_minutes):
         self.coordinator.set_block_temp(target_temp, holding_time_in_minutes)
 
+    def run_tc_profile(self, steps, repeats = 1):
+        self.coordinator.run_tc_profile(steps, repeats)
+
     def set_tempdeck_temp(self, celcius, holding_time_in_minutes):
         self.coordinator.set_tempdeck_temp(celcius, holding_time_in_minutes)
 
@@ -84,10 +95,11 @@ class Api:
         self.coordinator.void_plate_depth(plate, void)
 
     def take_picture(self, source = None):
+        self.coordinator.flush_ops() # Liquid steps recorded in a batch() happen before the picture
         if source != None:
             self.coordinator.go_to_position_to_take_picture(source)
         print(f"Sending {self.protocol_flags['protocol_folder']} folder to webapp")
-        requests.post(WEB_ADDRESS, json=self.protocol_flags)
+        self.webapp_session.post(WEB_ADDRESS, json=self.protocol_flags)
 
     def set_pictures_folder(self,  folder: str = 'protocol_pics'):
         print(f"API: Folder for pics set to: {folder} ")
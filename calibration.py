@@ -19,19 +19,29 @@ def unit_vector(vector):
     magnitude = np.linalg.norm(vector)
     return vector/magnitude
 
+# Calculate the locations of a whole grid of wells/pots at once, spanning a plane from point_a with the unit vectors u1 (columns) and u2 (rows)
+    # The locations are returned as a (rows * columns, 3) array ordered row by row from left to right
+def map_out_grid(point_a, u1, u2, grid, column_distance, row_distance, column_offset = 0):
+    rows, columns = np.mgrid[0:grid[0], 0:grid[1]]
+    column_displacements = column_offset + columns.ravel() * column_distance
+    row_displacements = rows.ravel() * row_distance
+    return point_a + np.outer(column_displacements, u1) + np.outer(row_displacements, u2) # Formula for spanning a plane with two vectors and an initial displacement
+
 # This method receives three calibration points and guesses the fourth (fourth corner of the Chip/Plate component)
 def guess_fourth_calibration_point(calibration_points):
-    ordered_calibration_points = reorder_calibration_points(calibration_points) # The three calibration points need to be in the right order or the contructor vectors won't be set properly
-
-    # Constructor vectors
-    vector_a = np.array(ordered_calibration_points[1]) - np.array(ordered_calibration_points[0])
-    vector_b = np.array(ordered_calibration_points[2]) - np.array(ordered_calibration_points[0])
-
-    # Vector arithmetic
-    vector_c = vector_a + vector_b
+    a, b, c = (np.array(point, dtype=np.float64) for point in calibration_points)
+
+    # The corner of the rectangle among the three points is the one opposite to the longest side (the diagonal), no need to reorder all of the points
+    bc, ca, ab = np.linalg.norm(c - b), np.linalg.norm(a - c), np.linalg.norm(b - a)
+    if bc >= ca and bc >= ab:
+        corner, diagonal_start, diagonal_end = a, b, c
+    elif ca >= ab:
+        corner, diagonal_start, diagonal_end = b, c, a
+    else:
+        corner, diagonal_start, diagonal_end = c, a, b
 
-    # Calculate 4th point
-    fourth_calibration_point = np.array(ordered_calibration_points[0]) + vector_c
+    # Parallelogram identity: the fourth point is the sum of the two ends of the diagonal minus the corner
+    fourth_calibration_point = diagonal_start + diagonal_end - corner
     return fourth_calibration_point
 
 # This method receives a list of three points in space (a list) and reorders them to be understandable for the system
@@ -98,8 +108,6 @@ def map_out_wells(chip_parameters, calibration_points):
     point_distance = chip_parameters["pointDistance"]
     well_distance = chip_parameters["wellDistance"]
 
-    locations = [] # This is the list of tuples with the locations of all the wells in a chip, that will be returned: [ (x,y,z), ...]
-    
     # Define points
     point_a = np.array(ordered_calibration_points[0]) # This point will be the reference for all vectors and displacements
     point_b = np.array(ordered_calibration_points[1])
@@ -116,19 +124,11 @@ def map_out_wells(chip_parameters, calibration_points):
     # Initial horizontal offset
     d = point_distance
 
-    # Go through each row and column, create locations, and append them to the locations list
+    # Create the locations of all the wells in one operation
         # NOTE: the order in which they are stored is row by row from left to right, using an imaginary
         # rectangular table laying down on its long side
-    for row in range(grid[0]):
-        for column in range(grid[1]):
-            displacement = u1 * (d + column * well_distance) + u2 * (row * well_distance) # Formula for spanning a plane with two vectors and an initial displacement
-            new_location = point_a + displacement # Calculated location of the new well
-            x,y,z = new_location # Unpack locations from the numpy array
-            array_location = [x, y, z]
-            new_tuple = (x,y,z) # Pack locations in appropriate format
-            # locations.append(new_tuple)
-            locations.append(array_location)
-    return locations#locations
+    locations = map_out_grid(point_a, u1, u2, grid, well_distance, well_distance, column_offset=d)
+    return locations.tolist() # List of the locations of all the wells in a chip: [ [x,y,z], ...]
 
 # This method is provided a grid and row_types and returns a list with the type of well that corresponds to each index
 def get_well_types(grid, row_types):
@@ -187,8 +187,6 @@ def map_out_pots(plate_parameters, calibration_points):
     pot_distance_r = plate_parameters["potDistance_r"]
     pot_distance_c = plate_parameters["potDistance_c"]
 
-    locations = [] # This is the list of tuples with the locations of all the wells in a chip, that will be returned: [ (x,y,z), ...]
-    
     # Define points
     point_a = np.array(ordered_calibration_points[0]) # This point will be the reference for all vectors and displacements
     point_b = np.array(ordered_calibration_points[1])
@@ -202,17 +200,11 @@ def map_out_pots(plate_parameters, calibration_points):
     u1 = unit_vector(v1)
     u2 = unit_vector(v2)
 
-    # Go through each row and column, create locations, and append them to the locations list
+    # Create the locations of all the pots in one operation
         # NOTE: the order in which they are stored is row by row from left to right, using an imaginary
         # rectangular table laying down on its long side
-    for row in range(grid[0]):
-        for column in range(grid[1]):
-            displacement = u1 * (column * pot_distance_c) + u2 * (row * pot_distance_r) # Formula for spanning a plane with two vectors and an initial displacement
-            new_location = point_a + displacement # Calculated location of the new well
-            x,y,z = new_location # Unpack locations from the numpy array
-            new_tuple = (x,y,z) # Pack locations in appropriate format
-            locations.append(new_tuple)
-    return locations
+    locations = map_out_grid(point_a, u1, u2, grid, pot_distance_c, pot_distance_r)
+    return [tuple(location) for location in locations.tolist()] # List of the locations of all the pots in a plate: [ (x,y,z), ...]
 
 def create_plate(model_name, plate_parameters, pot_locations):
 
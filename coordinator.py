@@ -39,22 +39,33 @@ from drivers.OTdriver import OT2_nanotrons_driver, SLOW_SPEED
 from drivers.TDdriver import TempDeck
 from drivers.TCdriver import Thermocycler
 from protocol_creator import ProtocolCreator
-from joystick import XboxJoystick
+from joystick import XboxJoystick, TRIGGERS_AXIS, HATS_DICT, AXIS_EVENT, BUTTON_EVENT, HAT_EVENT, STOP_EVENT
 from joystick_profile import *
 from labware_class import *
 from models_manager import ModelsManager
 from calibration import *
 from deck import *
 from keyboard import Keyboard
+from serial.serialutil import SerialException
+from opentrons.drivers.serial_communication import SerialNoResponse
 import asyncio
 import threading
+import queue
+import contextlib
 import math	
+import numbers
 import time
 import logging
 import os
 import sys
 import platform
 from collections import deque 
+import numpy as np
+import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 DISTANCE = 10 #mm
 LINUX_OS = 'posix'
@@ -67,14 +78,27 @@ LABWARE_PLATE = "p"
 LABWARE_SYRINGE = "s"
 DEFAULT_PROFILE = "default_profile.json"
 PIPPETE_POSITION_WHEN_MOVING_TC_LID = '5'
+PARKED_POSITION_TOLERANCE = 0.5 # mm. Distance under which the pipette is considered to be already parked at a location
+SLOTS_BLOCKED_BY_TC_LID = frozenset({'7', '8', '10', '11'}) # Slots under the thermocycler, the lid has to be opened before going there
 FROM_NANOLITERS = 0.001
 REFRESH_COORDINATE_INTERVAL = 0.1
+COORDINATES_CACHE_FRACTION = 0.5 # Fraction of the refresh interval during which get_current_coordinates() returns the last reading
 ASPIRATE_SPEED = SLOW_SPEED
 POSITION_IN_Z_TO_PLACE_WHEN_GOING_TO_SLOT = 150
 TIME_TO_SETTLE = 0.5 #SECONDS
+STEP_ASPIRATE = "aspirate" # Kinds of liquid steps recorded inside of a batch()
+STEP_DISPENSE = "dispense"
+BACKLASH_NL = 100 # Extra volume aspirated and dispensed back when aspirating to account for the backlash of the plunger
 PLATE_DEPTH = "Plate's depth"
 AIR_GAP_NL_AMOUNT = 50
 AIR_GAP_ASPIRATING_Z_STEP_DISTANCE = 25
+TEMPERATURE_TOLERANCE = 1 # CELSIUS. Allowed difference between the temperature of a module and its target
+HOLD_PROGRESS_LOG_INTERVAL = 60 # SECONDS. Time between progress messages while holding a temperature
+TEMPERATURE_POLL_INTERVAL = 0.5 # SECONDS. Shortest time between temperature readings while waiting for a module to reach its target
+MAX_TEMPERATURE_POLL_INTERVAL = 5 # SECONDS. Longest time between temperature readings, used while the target is still far away
+TEMPERATURE_POLL_FRACTION = 0.5 # Fraction of the expected time to reach the target that is waited before reading the temperature again
+TEMPERATURE_READ_RETRIES = 3 # Consecutive failed temperature readings tolerated before giving up on waiting for a module
+JOYSTICK_REPEAT_INTERVAL = 0.2 # SECONDS. Time without joystick events after which the inputs still being held get executed again (allows the user to loose the button)
 
 
 STANDARD_LEFT_OVER = 200
@@ -86,48 +110,96 @@ SYRINGE_BOTTOM = -190
 SYRINGE_SWEET_SPOT = -165 # Place where the plunger is at 3/4 from the top to bottom
 SYRINGE_TOP = -90
 
+# Calibration points of a chip/plate. Each point has a bit in the calibration mask that tells if it has been stored
+NUMBER_OF_CALIBRATION_POINTS = 3
+FRONT_LEFT_POINT = 0
+BACK_LEFT_POINT = 1
+BACK_RIGHT_POINT = 2
+ALL_CALIBRATION_POINTS_MASK = (1 << NUMBER_OF_CALIBRATION_POINTS) - 1
+
 from constants import RUNNING_APP_FOR_REAL
 
+# The operating system is resolved once when the module is imported (platform.system() calls uname())
+if os.name == WINDOWS_OS:
+    OS_KIND = "windows"
+elif os.name == LINUX_OS:
+    OS_KIND = "mac" if platform.system() == MACBOOK_OS else "linux"
+else:
+    OS_KIND = "other"
+
+# String used by ModelsManager and XboxJoystick for each operating system ("w" for windows or "r" for raspberry pi/linux)
+OS_STRINGS = {"windows": "w", "linux": "r", "mac": "r"}
+OS_TAG = OS_STRINGS.get(OS_KIND, "") # Shared by every subordinate class so that all of them agree on the operating system
+
+# Controller created for each operating system when running the app for real
+CONTROLLER_FACTORIES = {
+    "windows": lambda coordinator: XboxJoystick(OS_TAG),
+    "linux": lambda coordinator: XboxJoystick(OS_TAG),
+    "mac": lambda coordinator: Keyboard(coordinator.ot_control),
+}
+
 
 def interrupt_callback(res):
     sys.stderr.write(res)
 
 class Coordinator:
+    # Fixed set of instance attributes (no per instance __dict__). Any new attribute assigned in the class has to be added here
+    __slots__ = ('_ot_control', 'myLabware', 'joystick_profile', '_tc_control', '_td_control', 'protocol_creator',
+                 '_controller', '_hardware_lock', 'myProfile', '_axes_dispatch', '_button_dispatch', '_hat_dispatch',
+                 'myModelsManager', 'coordinates_refresh_rate', 'deck', 'user_input', 'folder_for_pictures',
+                 'picture_flag', 'toggle_flag', 'clean_water', 'wash_water', 'waste_water', 'amount_wanted',
+                 'syringe_bottom_coordinate', 'syringe_sweet_spot_coordinate', 'syringe_top_coordinate',
+                 '_syringe_cache', '_calibration_points', '_calibration_mask',
+                 '_event_loop', '_event_loop_thread', '_event_loop_lock', '_coordinates_cache', '_coordinates_cache_time', '_slot_to_properties',
+                 '_park_location', '_settings_cache', '_pending_ops', '_batching',
+                 '_volume_prompt', '_slot_locations', '_labware_summary')
+
     def __init__(self):
         """ Initialize the class and instanciate all the subordinate classes
 
         Args:method_name
             joystick_profile ([json file name]): specify a file with the mapping between joystick elements and methods triggered when those elements are pressed by user
         """
-        operating_system = ""
-        os_recognized = os.name
-        self.ot_control = OT2_nanotrons_driver()
+        # The hardware (OT2, thermocycler, tempdeck, and controller) is only initialized the first time it's used, see the HARDWARE section
+        self._ot_control = None
+        self._tc_control = None
+        self._td_control = None
+        self._controller = None
+        self._hardware_lock = threading.RLock() # Avoids two threads opening the same port. Reentrant because some controllers need the OT2 driver
         
         self.myLabware = Labware_class()
         self.joystick_profile = DEFAULT_PROFILE
-        self.tc_control = Thermocycler(interrupt_callback=interrupt_callback)
-        self.td_control = TempDeck()
+        self._axes_dispatch = None # Joystick dispatch tables, built when a profile is loaded
+        self._button_dispatch = None
+        self._hat_dispatch = None
         self.protocol_creator = ProtocolCreator()
+        # Single event loop, running on its own thread, shared by every coroutine of the system (thermocycler commands, temperature waits, asynchronous protocol steps)
+        self._event_loop = None
+        self._event_loop_thread = None
+        self._event_loop_lock = threading.Lock() # Commands can come from different threads, only one of them can start the loop
         
-        if os_recognized == WINDOWS_OS:
-            logging.info("Operating system: Windows")
-            operating_system = "w"
-            if RUNNING_APP_FOR_REAL:
-                self.myController = XboxJoystick(operating_system)
-        elif os_recognized == LINUX_OS:
-            logging.info("Operating system: Linux")
-            operating_system = "r"
-            if RUNNING_APP_FOR_REAL:
-                if platform.system() == MACBOOK_OS:
-                    self.myController = Keyboard(self.ot_control)
-                else:
-                    self.myController = XboxJoystick(operating_system)
+        logging.info("Operating system: %s", OS_KIND)
         if RUNNING_APP_FOR_REAL:
-            self.myProfile = Profile(self.joystick_profile)
-        self.myModelsManager = ModelsManager(operating_system)
+            self.load_joystick_profile(self.joystick_profile)
+        self.myModelsManager = ModelsManager(OS_TAG)
         self.coordinates_refresh_rate = REFRESH_COORDINATE_INTERVAL
+        self._settings_cache = None # Last dictionary built by get_current_settings(), cleared whenever a setting changes
+        # Liquid steps (kind, volume, location or None for the current position) waiting to be sent to the robot while inside of a batch()
+        self._pending_ops = []
+        self._batching = False
+        # Last coordinates read and when they were read, so that every reader within the same refresh tick gets the same tuple
+        self._coordinates_cache = None
+        self._coordinates_cache_time = 0.0
         self.deck = Deck()
+        # Location the pipette goes to for every deck slot, the deck geometry is fixed so the slot definitions are only searched once
+        self._slot_locations = {str(slot): self.compute_deck_slot_location(str(slot)) for slot in self.deck}
+        # Location where the pipette waits while the thermocycler lid moves, the deck slot is fixed so it's resolved only once
+        self._park_location = self.get_deck_slot_location(PIPPETE_POSITION_WHEN_MOVING_TC_LID)
+        # Properties of the labware component sitting on each deck slot, rebuilt every time the labware changes
+        self._slot_to_properties = dict()
+        self._labware_summary = None # Models and nicknames of the current labware, built when first requested after every labware change
         self.user_input = 0
+        self._volume_prompt = None # Thread waiting for the user to type the volume used by the triggers
         self.folder_for_pictures = 'default_folder'
         self.picture_flag = False
         self.toggle_flag = False
@@ -142,6 +214,13 @@ class Coordinator:
         self.syringe_sweet_spot_coordinate =  SYRINGE_SWEET_SPOT 
         self.syringe_top_coordinate =  SYRINGE_TOP 
 
+        # Calibration points of the component being calibrated (one row per point) and the bitmask of the points already stored
+        self._calibration_points = np.zeros((NUMBER_OF_CALIBRATION_POINTS, 3), dtype=np.float64)
+        self._calibration_mask = 0
+
+        # Cached conversion factor (nL -> stepper displacement) for the syringe currently loaded
+        self._syringe_cache = {"model": None, "modification_time": None, "k": None}
+
         # initialize the logging info format
         format = "%(asctime)s: %(message)s" #format logging
         logging.basicConfig(format=format, level=logging.INFO,
@@ -175,61 +254,208 @@ class Coordinator:
         rest of the methods are supporting functions for the operation of manual_control()
     """
     def get_syringe_settings(self):
+        x, y, z, b, c = self.ot_control.snapshot_xyzbc()
         settingsDic = {}
         settingsDic["s step"] = self.ot_control.get_step_size_syringe_motor()
         settingsDic["nL"] = self.ot_control.get_nL()
         settingsDic["xyz step"] = self.ot_control.get_step_size_xyz_motor()
         settingsDic['pipette'] = self.ot_control.get_side()
-        settingsDic['x'] = self.ot_control.position['X']
-        settingsDic['y'] = self.ot_control.position['Y']
-        settingsDic['z'] = self.ot_control.position['Z']
-        settingsDic['b'] = self.ot_control.position['B']
-        settingsDic['c'] = self.ot_control.position['C']
+        settingsDic['x'] = x
+        settingsDic['y'] = y
+        settingsDic['z'] = z
+        settingsDic['b'] = b
+        settingsDic['c'] = c
         return settingsDic
 
+    """
+    HARDWARE SECTION
+        The subordinate classes that talk to the hardware are created on first use, so that callers that don't need the hardware 
+        (i.e. creating labware models or computing calibration points) don't wait for serial ports or the joystick to be opened
+    """
+    @property
+    def ot_control(self):
+        if self._ot_control is None:
+            with self._hardware_lock:
+                if self._ot_control is None:
+                    self._ot_control = OT2_nanotrons_driver()
+        return self._ot_control
+
+    @property
+    def tc_control(self):
+        if self._tc_control is None:
+            with self._hardware_lock:
+                if self._tc_control is None:
+                    self._tc_control = Thermocycler(interrupt_callback=interrupt_callback)
+        return self._tc_control
+
+    @property
+    def td_control(self):
+        if self._td_control is None:
+            with self._hardware_lock:
+                if self._td_control is None:
+                    self._td_control = TempDeck()
+        return self._td_control
+
+    @property
+    def myController(self):
+        """ Controller used for manual control. Raises AttributeError when there is no controller for this system, callers already handle that case
+        """
+        if self._controller is None:
+            if not (RUNNING_APP_FOR_REAL and OS_KIND in CONTROLLER_FACTORIES):
+                raise AttributeError("No controller available")
+            with self._hardware_lock:
+                if self._controller is None:
+                    self._controller = CONTROLLER_FACTORIES[OS_KIND](self)
+                    if self._axes_dispatch is not None:
+                        self.build_joystick_dispatch() # The profile was loaded before the controller existed, some of its methods belong to the controller
+        return self._controller
+
+    def resolve_profile_method(self, function):
+        """ Finds the bound method (in ot_control first and then in myController) that matches the name of a function from the profile
+
+        Args:
+            function ([function]): unbound function stored in the joystick profile mapping
+
+        Returns:
+            [method]: bound method that should be executed for the joystick element, or None for elements mapped to "nothing" (or to a controller method before the controller exists)
+        """
+        method_name = function.__name__ # Profile.find_method() already rejected the names that no class implements
+        method = getattr(self.ot_control, method_name, None)
+        if method is None:
+            method = getattr(self._controller, method_name, None) # Only if the controller was already created, it rebuilds the dispatch when it gets created
+        return method
+
+    def load_joystick_profile(self, joystick_profile):
+        """ Loads a joystick profile and resolves its methods, so that the joystick works with the new mapping right away
+
+        Args:
+            joystick_profile ([str]): name of the file with the mapping between joystick elements and methods
+        """
+        self.joystick_profile = joystick_profile
+        self.myProfile = Profile(joystick_profile)
+        self.build_joystick_dispatch()
+
+    def build_joystick_dispatch(self):
+        """ Resolves the method names of the loaded profile into bound methods once so that monitor_joystick() doesn't have to look them up on every tick.
+            It has to be called again whenever the mappings of myProfile are modified
+        """
+        self._axes_dispatch = [self.resolve_profile_method(function) for function in self.myProfile.get_axes_mapping()]
+        self._button_dispatch = dict()
+        for button, function in self.myProfile.get_buttons_mapping().items():
+            method = self.resolve_profile_method(function)
+            if method is not None:
+                self._button_dispatch[button] = method
+        self._hat_dispatch = dict()
+        for hat, function in self.myProfile.get_hats_mapping().items():
+            method = self.resolve_profile_method(function)
+            if method is not None:
+                self._hat_dispatch[hat] = method
+
+    def dispatch_axis(self, axis_index, axis_value):
+        """ Executes the methods associated with a joystick axis that is away from its natural position
+
+        Args:
+            axis_index ([int]): index of the axis in the joystick
+            axis_value ([float]): reading of the axis
+        """
+        submit = self.ot_control.submit
+        if axis_index == TRIGGERS_AXIS:
+            if axis_value > 0:
+                # print("ASPIRATE")
+                submit(self.aspirate, self.user_input, SLOW_SPEED)
+            else:
+                # print("DISPENSE")
+                submit(self.dispense, self.user_input, SLOW_SPEED)
+        method = self._axes_dispatch[axis_index]
+        if method:
+            submit(method, axis_value)
+
+    def dispatch_button(self, button, button_value, held = False):
+        """ Executes the method associated with a joystick button that is being pressed
+
+        Args:
+            button ([str]): name of the button i.e. "A" or "START"
+            button_value ([int]): reading of the button (bumpers carry their direction in the sign)
+            held ([bool]): True for the repeats of a button that is held down, which may be dropped when the robot is behind. A single press always waits to be queued
+        """
+        if button == "START":
+            self.prompt_user_volume()
+        method = self._button_dispatch.get(button)
+        if method:
+            self.ot_control.submit(method, button_value, droppable=held)
+
+    def prompt_user_volume(self):
+        """ Asks the user for the volume used by the triggers on a separate thread, so that the joystick keeps working while the volume is typed
+        """
+        if self._volume_prompt is not None and self._volume_prompt.is_alive():
+            return # The user is already being asked
+        self._volume_prompt = threading.Thread(target=self.read_user_volume, daemon=True, name='Volume prompt')
+        self._volume_prompt.start()
+
+    def read_user_volume(self):
+        """ Reads the volume used by the triggers from the console and sets the step size of the syringe motor accordingly
+        """
+        user_input = input("Enter volume to aspirate in nanoliters: ")
+        try:
+            volume = int(user_input)
+        except ValueError:
+            print(f"Volume not understood: {user_input}")
+            return
+        self.user_input = user_input
+        self.ot_control.set_nL(user_input)
+        self.ot_control.set_step_size_syringe_motor(self.volume_to_displacement_converter(volume)) # The triggers move the syringe by this step size
+
+    def dispatch_hat(self, hat, hat_value, held = False):
+        """ Executes the method associated with a joystick hat (arrow) that is being pressed
+
+        Args:
+            hat ([str]): name of the hat i.e. "UP" or "LEFT"
+            hat_value ([int]): reading of the hat, either 1 or -1
+            held ([bool]): True for the repeats of a hat that is held down, which may be dropped when the robot is behind. A single press always waits to be queued
+        """
+        method = self._hat_dispatch.get(hat)
+        if method:
+            self.ot_control.submit(method, hat_value, droppable=held)
+
+    def dispatch_joystick_event(self, event):
+        """ Executes the method associated with the only joystick element that changed its state
+
+        Args:
+            event ([JoystickEvent]): kind, element, and new value of the element that changed
+        """
+        if not event.value:
+            return # Releasing an element doesn't trigger anything
+        if event.kind == AXIS_EVENT:
+            self.dispatch_axis(event.element, event.value)
+        elif event.kind == BUTTON_EVENT:
+            self.dispatch_button(event.element, event.value)
+        elif event.kind == HAT_EVENT:
+            self.dispatch_hat(event.element, event.value)
+
     def monitor_joystick(self):
         """ This method reads the values being collected from triggered inputs in the joystick and executes the methods associated with them
         """
-        axes = self.myController.deliver_axes() # Dictionary with the axes index and value that are being pressed
-        buttons = self.myController.deliver_buttons() # List with strings according to the buttons currently being pressed
-        hats = self.myController.deliver_hats() # List with strings according to the buttons currently being pressed
+        controller = self.myController
+        axes = controller.deliver_axes() # Dictionary with the axes index and value that are being pressed
+        buttons = controller.deliver_buttons() # List with strings according to the buttons currently being pressed
         
-        for axis_index in range(len(self.myController.axes[:5])): # 5 is to reject the last index in the list in case there is one (for Unix OS)
-            if axis_index == 2:
-                if self.myController.axes[2] > 0:
-                    # print("ASPIRATE")
-                    self.aspirate(self.user_input, SLOW_SPEED)
-                elif self.myController.axes[2] < 0:
-                    # print("DISPENSE")
-                    self.dispense(self.user_input, SLOW_SPEED)
-                else:
-                    pass
-            method_name = self.myProfile.get_axis_function(axis_index).__name__            
-            method = getattr(self.ot_control, method_name, False)
-            method(self.myController.axes[axis_index])
-
-        if (len(buttons) != 0):
-            for button in buttons:
-                if button == "START":
-                    self.user_input = input("Enter volume to aspirate in nanoliters: ")
-                    self.ot_control.set_nL(self.user_input)
-                    self.ot_control.set_step_size_syringe_motor(self.volume_to_displacement_converter(int(self.user_input)))
-                method_name = self.myProfile.get_button_function(button).__name__
-                method = getattr(self.ot_control, method_name, False)
-                if not method:
-                    method = getattr(self.myController, method_name, False)
-                method(self.myController.get_button_by_name(button))
-
-        if (len(hats) != 0):
-            for hat in hats:
-                method_name = self.myProfile.get_hat_function(hat).__name__
-                method = getattr(self.ot_control, method_name, False)
-                method(self.myController.get_hats()[self.myController.get_hats_dict_index(hat)])
+        # deliver_axes() only contains the first 5 axes (rejects the garbage one on Unix OS) that are away from their natural position
+        for axis_index, axis_value in axes.items():
+            self.dispatch_axis(axis_index, axis_value)
+
+        for button in buttons:
+            self.dispatch_button(button, controller.get_button_by_name(button), held=True)
+
+        # The hats are walked by index in a single pass, so no hat name has to be looked up back into its index
+        for hat_index, hat_value in enumerate(controller.get_hats()):
+            if hat_value:
+                self.dispatch_hat(HATS_DICT[hat_index], hat_value, held=True)
 
     def manual_control(self):
-        """ This method opens a secondary thread to listen to the input of the joystick (have a real time update of the triggered inputs) and calls monitor_joystick on the main thread on a loop
+        """ This method opens a secondary thread to listen to the input of the joystick and, on the main thread, executes the methods of the joystick elements that change their state.
+            Elements that are held down get executed again every JOYSTICK_REPEAT_INTERVAL
         """
-        if platform.system() == MACBOOK_OS:
+        if OS_KIND == "mac":
             try:
                 self.myController.listen()
             except AttributeError:
@@ -238,9 +464,23 @@ class Coordinator:
             try:  
                 t1 = threading.Thread(target=self.myController.listen)
                 t1.start()
-                while(t1.is_alive()):
-                    self.monitor_joystick()
-                    time.sleep(0.2) # Debounce method, so that it allows for the user to loose the button 
+                events = self.myController.event_queue
+                while True:
+                    # While nothing is held down there is nothing to repeat, so it just sleeps until the next event
+                    timeout = JOYSTICK_REPEAT_INTERVAL if self.myController.has_active_input() else None
+                    try:
+                        event = events.get(timeout=timeout)
+                    except queue.Empty:
+                        # Nothing changed for a while, repeat the inputs that are still being held
+                        self.monitor_joystick()
+                        continue
+                    if event.kind == STOP_EVENT:
+                        break # The listener pushes this right before its thread ends
+                    self.dispatch_joystick_event(event)
+                t1.join()
+                self.ot_control.wait_for_commands() # Let the last queued moves finish before anyone reads the position
+                self.invalidate_coordinates_cache()
+                self.invalidate_settings_cache() # The joystick can change the step size
             except AttributeError:
                 print("No controller connected")
 
@@ -248,7 +488,7 @@ class Coordinator:
         """ This method turns off the flag that enables listening to the joystick, which triggers killing manual control given that the loop depends on that flag
         """
         try:
-            self.myController.stop_listening("") # It as a "" as an argument because it askes for a dummy argument for the method(self.myController.get_hats()[self.myController.get_hats_dict_index(hat)])
+            self._controller.stop_listening("") # It as a "" as an argument because it askes for a dummy argument for the method(self.myController.get_hats()[self.myController.get_hats_dict_index(hat)])
         except AttributeError:
             print("Trying to stop listening controller inputs but no controller connected")
 
@@ -261,11 +501,13 @@ class Coordinator:
         """ This method goes through a list of predefined steps 
         """
         self.ot_control.double_step_size_XYZ("") # "" is the dummy argument
+        self.invalidate_settings_cache()
     
     def down_step_size(self):
         """ This method goes through a list of predefined steps  """
        
         self.ot_control.half_step_size_XYZ("") # "" is the dummy argument
+        self.invalidate_settings_cache()
 
 
 
@@ -285,6 +527,7 @@ class Coordinator:
         Args:
             location ([tuple]): contains three float numbers indicating a target 3D coordinate
         """
+        self.flush_ops() # Liquid queued in a batch() belongs to the current position
         self.ot_control.move_to(location=location)
 
     def go_to_position_to_take_picture(self, location):
@@ -297,6 +540,7 @@ class Coordinator:
         Args:
             location ([tuple]): contains three float numbers indicating a target 3D coordinate
         """
+        self.flush_ops()
         self.open_lid() # Prevents the pipette to crash with the thermocycler
         x = location[0]
         y = location[1]
@@ -306,19 +550,48 @@ class Coordinator:
         
     def go_to_deck_slot(self, slot):
         """ This method goes allows the OT2 to move to a designated physical slot  """
-        slot_number = float(slot)
-        logging.info(f"Moving to slot {slot}")
-        x = self.deck.get_slot_center(slot)[0]
-        y = self.deck.get_slot_center(slot)[1]
-        z = POSITION_IN_Z_TO_PLACE_WHEN_GOING_TO_SLOT
-        location = [x, y, z]
-        if (slot_number == 7 or slot_number == 8 or slot_number == 10 or slot_number == 11):
+        logging.info("Moving to slot %s", slot)
+        location = self.get_deck_slot_location(slot)
+        if str(slot) in SLOTS_BLOCKED_BY_TC_LID:
             self.open_lid() # We open the lid first to avoid collitions
             if self.ot_control.tc_lid_flag == 'open': 
                 self.go_to_position(location)
         else:   
             self.go_to_position(location)        
 
+    def get_deck_slot_location(self, slot):
+        """ Obtains the location the pipette goes to when moving to a deck slot (center of the slot at a safe height)
+
+        Args:
+            slot ([str]): name of the slot in the deck i.e. '5'
+
+        Returns:
+            [list]: contains three float numbers indicating the 3D coordinate of the slot
+        """
+        return list(self._slot_locations[str(slot)]) # Copy, callers are free to modify the location they get
+
+    def compute_deck_slot_location(self, slot):
+        """ Computes the location of a deck slot from the deck definition, used to fill the table read by get_deck_slot_location()
+
+        Args:
+            slot ([str]): name of the slot in the deck i.e. '5'
+
+        Returns:
+            [list]: contains three float numbers indicating the 3D coordinate of the slot
+        """
+        slot_center = self.deck.get_slot_center(slot)
+        return [slot_center[0], slot_center[1], POSITION_IN_Z_TO_PLACE_WHEN_GOING_TO_SLOT]
+
+    def park_for_tc_lid(self):
+        """ Moves the pipette out of the way of the thermocycler lid, unless it is already parked there
+        """
+        current_location = self.ot_control.snapshot_xyz()
+        park_location = self._park_location
+        if any(abs(current - target) > PARKED_POSITION_TOLERANCE for current, target in zip(current_location, park_location)):
+            # The parking slot is not covered by the lid, so the pipette goes straight there (for avoiding collitions)
+            logging.info("Moving to slot %s", PIPPETE_POSITION_WHEN_MOVING_TC_LID)
+            self.go_to_position(park_location)
+
     def go_to_well(self, chip, well_nickname):
         """ This method moves the system to the location assigned to a specific well in a chip by retrieving the location from myLabware and then calling go_to_position()
 
@@ -348,9 +621,9 @@ class Coordinator:
             volume ([float]): volume of liquid to be aspirated. UNIT: NANOLITERS
             speed ([float]): speed at which the given volume of liquid will be aspirated. UNIT: MILIMITERS/SECOND
         """     
-        step_displacement = self.volume_to_displacement_converter(volume) 
+        step_displacement = self.volume_to_displacement_converter(volume)
         self.ot_control.set_step_size_syringe_motor(step_displacement)
-        self.ot_control.plunger_L_Up(size=self.ot_control.s_step_size)
+        self.ot_control.plunger_L_Up(size=step_displacement)
 
     def drop_off_liquid(self, volume, speed =SLOW_SPEED):
         """ Sends a command to the syringe motor to displace a distance that is equivalent to dispensing a given volume of liquid
@@ -361,7 +634,7 @@ class Coordinator:
         """
         step_displacement = self.volume_to_displacement_converter(volume)
         self.ot_control.set_step_size_syringe_motor(step_displacement)
-        self.ot_control.plunger_L_Down(size=self.ot_control.s_step_size)
+        self.ot_control.plunger_L_Down(size=step_displacement)
     
     def volume_to_displacement_converter(self, volume):
         """ This method converts a certain amount of volume into displacement needed to move that amount of liquid in the syringe by retrieving the syringe dimensions from the system and doing some simple math
@@ -372,38 +645,148 @@ class Coordinator:
         Returns:
             [float]: displacement that results in the displacement of the provided volume on the syringe. UNIT: MILIMETERS
         """
+        # Only converts, setting the step size of the syringe motor is up to the caller
+        return volume * self.get_syringe_conversion_factor()
+
+    def get_syringe_conversion_factor(self):
+        """ Obtains the factor that converts nanoliters into stepper displacement for the current syringe model. The factor is only
+        recomputed when the syringe model changes or its model file is modified (i.e. uploaded again from the web app)
+
+        Returns:
+            [float]: displacement per nanoliter of liquid on the current syringe. UNIT: MILIMETERS/NANOLITER
+        """
         # Get the current syringe model
         syringe_model = self.myLabware.get_syringe_model()
-        # Extract syringe radius
-        syringe_parameters = self.myModelsManager.get_model_parameters(LABWARE_SYRINGE, syringe_model)
-        diameter = syringe_parameters["inner_diameter"] # This parameter has units of mm
-        radius = diameter / 2
-
-        # Calculate area and distance (height of the cylindric volume)
-        area = (math.pi * radius * radius) # Basic formula for area
-        distance_in_mm = volume * FROM_NANOLITERS / area # Volume is assumed to come in nanoLiters to it's converted to microliters to perform accurate calculations
-        distance_to_feed_to_stepper_motor = distance_in_mm * UNIT_CONVERSION
-
-        # Return the distance needed to displace that amount of volume
-        self.ot_control.set_step_size_syringe_motor(distance_to_feed_to_stepper_motor)
-        return distance_to_feed_to_stepper_motor
+        modification_time = self.myModelsManager.get_model_modification_time(LABWARE_SYRINGE, syringe_model)
+        cache = self._syringe_cache
+        if cache["model"] != syringe_model or cache["modification_time"] != modification_time or cache["k"] is None:
+            # Extract syringe radius
+            syringe_parameters = self.myModelsManager.get_model_parameters(LABWARE_SYRINGE, syringe_model)
+            diameter = syringe_parameters["inner_diameter"] # This parameter has units of mm
+            radius = diameter / 2
+
+            # Calculate area and conversion factor (height of the cylindric volume per nL)
+            area = (math.pi * radius * radius) # Basic formula for area
+            # Volume is assumed to come in nanoLiters to it's converted to microliters to perform accurate calculations
+            cache["k"] = FROM_NANOLITERS * UNIT_CONVERSION / area
+            cache["model"] = syringe_model
+            cache["modification_time"] = modification_time
+        return cache["k"]
+
+    def notify_syringe_changed(self):
+        """ Invalidates the cached syringe conversion factor so that it gets recomputed on the next conversion
+        """
+        self._syringe_cache["model"] = None
+        self._syringe_cache["modification_time"] = None
+        self._syringe_cache["k"] = None
         
+    def volumes_to_displacements(self, volumes):
+        """ Converts a whole sequence of volumes into syringe displacements in a single vectorized operation
+
+        Args:
+            volumes ([list]): volumes of liquid to be converted. UNIT: NANOLITERS
+
+        Returns:
+            [numpy.ndarray]: displacements that result in the displacement of each of the provided volumes on the syringe. UNIT: MILIMETERS
+        """
+        return np.asarray(volumes, dtype=float) * self.get_syringe_conversion_factor()
+
+    def run_protocol_batch(self, volumes):
+        """ Drives the syringe through a known sequence of aspirate/dispense steps converting all the volumes up front
+
+        Args:
+            volumes ([list]): signed volumes for each step, positive to aspirate and negative to dispense. UNIT: NANOLITERS
+        """
+        displacements = self.volumes_to_displacements(volumes)
+        for displacement in displacements.tolist():
+            if displacement > 0:
+                self.ot_control.set_step_size_syringe_motor(displacement)
+                self.ot_control.plunger_L_Up(size=displacement)
+            elif displacement < 0:
+                self.ot_control.set_step_size_syringe_motor(-displacement)
+                self.ot_control.plunger_L_Down(size=-displacement)
+
     def aspirate(self, volume, speed = SLOW_SPEED): 
         """ Pick up amount in nL and speed in nL/min  """
-        logging.info(f"Aspirating {volume} nL at speed {speed} nL/s")
+        logging.info("Aspirating %s nL at speed %s nL/s", volume, speed)
+        if self._batching:
+            self._pending_ops.append((STEP_ASPIRATE, int(volume), None))
+            return
         self.pick_up_liquid(int(volume)) # Pick up the amount needed
 
     def dispense(self, amount, speed = SLOW_SPEED): 
         """ Drop of amount in nL and speed in nL/min  """
-        logging.info(f"Dispensing {amount} nL at speed {speed} nL/s")
+        logging.info("Dispensing %s nL at speed %s nL/s", amount, speed)
+        if self._batching:
+            self._pending_ops.append((STEP_DISPENSE, int(amount), None))
+            return
         self.drop_off_liquid(int(amount))
 
+    @contextlib.contextmanager
+    def batch(self):
+        """ Context manager that records the aspirate(), dispense(), aspirate_from(), and dispense_to() calls made inside of it and sends
+            them to the robot in one pass. Consecutive steps of the same kind on the same location are folded into a single step.
+            Any other command that moves the robot or talks to the modules sends the pending steps first, so the order of the protocol is kept
+
+            with coordinator.batch():
+                coordinator.aspirate(100)
+                coordinator.aspirate(50) # Sent together with the previous one as 150 nL
+                coordinator.aspirate_from(500, custom('A1'))
+                coordinator.aspirate_from(500, custom('A1')) # Aspirated together with the previous one as 1000 nL
+        """
+        self._batching = True
+        try:
+            yield self
+        finally:
+            self._batching = False
+            self.flush_ops()
+
+    def flush_ops(self):
+        """ Sends the liquid steps recorded inside of a batch() to the robot, folding consecutive steps of the same kind on the same location
+        """
+        if not self._pending_ops:
+            return
+        steps = self.compile_steps(self._pending_ops)
+        self._pending_ops = []
+        self.run_compiled_steps(steps)
+
+    def compile_steps(self, steps):
+        """ Folds consecutive steps of the same kind on the same location into a single step with the added volume
+
+        Args:
+            steps ([list]): (kind, volume, location) for every step, location is None for steps at the current position
+
+        Returns:
+            [list]: (kind, volume, location) for every step left after folding
+        """
+        compiled = []
+        for kind, volume, location in steps:
+            if compiled and compiled[-1][0] == kind and compiled[-1][2] == location:
+                compiled[-1] = (kind, compiled[-1][1] + volume, location)
+            else:
+                compiled.append((kind, volume, location))
+        return compiled
+
+    def run_compiled_steps(self, steps):
+        """ Executes a list of steps returned by compile_steps()
+
+        Args:
+            steps ([list]): (kind, volume, location) for every step, location is None for steps at the current position
+        """
+        for kind, volume, location in steps:
+            if location is None:
+                self.run_protocol_batch([volume if kind == STEP_ASPIRATE else -volume])
+            elif kind == STEP_ASPIRATE:
+                self._aspirate_from_moves(volume, location)
+                time.sleep(TIME_TO_SETTLE) # Allow some time to the syringe to aspirate
+            else:
+                self._dispense_to_moves(volume, location)
+                time.sleep(TIME_TO_SETTLE) # Allow some time to the syringe to dispense
+
     def air_gap(self):
         """This is the function that allows the user to have an 50 nL airgap in the syringe"""
-        x = self.ot_control._position['X']
-        y = self.ot_control._position['Y']
-        z = self.ot_control._position['Z'] + AIR_GAP_ASPIRATING_Z_STEP_DISTANCE
-        new_location = [x, y, z]
+        x, y, z = self.ot_control.snapshot_xyz()
+        new_location = [x, y, z + AIR_GAP_ASPIRATING_Z_STEP_DISTANCE]
         self.go_to_position(new_location)
         self.aspirate(AIR_GAP_NL_AMOUNT, speed=ASPIRATE_SPEED)
 
@@ -488,6 +871,20 @@ class Coordinator:
         """
         return self.myLabware.labware_to_dictionary()
 
+    def get_labware_summary(self):
+        """ Obtains the model and the well/pot nicknames of every labware component. The summary is built once and reused until the labware changes
+
+        Returns:
+            [dict]: dictionary with two keys ("chips" and "plates") that map to lists of dictionaries with the "model" and "nicknames" of each component
+        """
+        if self._labware_summary is None:
+            full_labware_dict = self.get_full_current_labware()
+            self._labware_summary = {
+                "chips": [{"model": chip["model"], "nicknames": chip["well_nicknames"]} for chip in full_labware_dict["chips"]],
+                "plates": [{"model": plate["model"], "nicknames": plate["pot_nicknames"]} for plate in full_labware_dict["plates"]],
+            }
+        return self._labware_summary
+
     def save_labware_setup(self, output_file_name):
         """ Exports all the calibrated components to a file that can later be loaded onto the system to avoid recalibrating each component individually
 
@@ -504,11 +901,55 @@ class Coordinator:
         """
         print(f"Coordinator: Loading labware from {input_file_name}")
         self.myLabware.load_labware_from_file(input_file_name)
+        self.notify_syringe_changed()
+        self.update_syringe_coordinates() # The file might come with a different syringe model
+        self.refresh_slot_to_properties()
         chip_list = self.myLabware.chip_list
         plate_list = self.myLabware.plate_list
         labware = [chip_list, plate_list]
         return labware
 
+    def save_full_state(self, path):
+        """ Exports the labware, the settings, and the washing positions of the system to a single file, so that the whole state can be restored with one read
+
+        Args:
+            path ([str]): path of the output file
+        """
+        state = dict()
+        state["labware"] = self.get_full_current_labware()
+        state["settings"] = self.get_current_settings()
+        state["wash"] = {"clean": self.clean_water, "wash": self.wash_water, "waste": self.waste_water, "amount_wanted": self.amount_wanted}
+
+        # orjson is used when available since it's faster, numpy values come from the calibration
+        if orjson is not None:
+            with open(path, "wb") as output_file:
+                output_file.write(orjson.dumps(state, option=orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(path, "w") as output_file:
+                json.dump(state, output_file)
+
+    def load_full_state(self, path):
+        """ Restores the labware, the settings, and the washing positions of the system from a file created with save_full_state()
+
+        Args:
+            path ([str]): path of the input file
+        """
+        with open(path, "rb") as input_file:
+            state_data = input_file.read()
+        state = orjson.loads(state_data) if orjson is not None else json.loads(state_data)
+
+        self.myLabware.reset_chip_list()
+        self.myLabware.reset_plate_list()
+        self.myLabware.dictionary_to_labware(state["labware"])
+        self.refresh_slot_to_properties()
+
+        for setting_name, value in state["settings"].items():
+            self.update_setting(setting_name, value)
+
+        wash = state["wash"]
+        self.set_washing_positions(wash["clean"], wash["wash"], wash["waste"])
+        self.set_amount_wanted(wash["amount_wanted"])
+
     def get_available_labware_setup_files(self):
         """ Obtain the list of available files with previously calibrated and exported labware components
 
@@ -529,6 +970,60 @@ class Coordinator:
 
         return guess_fourth_calibration_point(calibration_points)
         
+    def reset_calibration_points(self):
+        """ Clears the calibration points stored for the component being calibrated
+        """
+        self._calibration_points[:] = 0
+        self._calibration_mask = 0
+
+    def store_calibration_point(self, index, position):
+        """ Stores one of the calibration points of the component being calibrated
+
+        Args:
+            index ([int]): index of the calibration point (FRONT_LEFT_POINT, BACK_LEFT_POINT, or BACK_RIGHT_POINT)
+            position ([tuple]): contains three float numbers indicating the 3D coordinate of the point
+        """
+        self._calibration_points[index] = position
+        self._calibration_mask |= (1 << index)
+
+    def calibration_points_complete(self):
+        """ Tells if all of the calibration points of the component being calibrated have been stored
+
+        Returns:
+            [bool]: True when every calibration point has been stored
+        """
+        return self._calibration_mask == ALL_CALIBRATION_POINTS_MASK
+
+    def get_calibration_points(self):
+        """ Obtains the calibration points stored for the component being calibrated
+
+        Returns:
+            [list]: list of three lists, each of which represents a point in 3 dimensions
+        """
+        return self._calibration_points.tolist()
+
+    def _is_calibration_point_updated(self, index):
+        return bool(self._calibration_mask & (1 << index))
+
+    def _set_calibration_point_updated(self, index, updated):
+        if updated:
+            self._calibration_mask |= (1 << index)
+        else:
+            self._calibration_mask &= ~(1 << index)
+
+    front_left_updated = property(lambda self: self._is_calibration_point_updated(FRONT_LEFT_POINT),
+                                  lambda self, updated: self._set_calibration_point_updated(FRONT_LEFT_POINT, updated))
+    back_left_updated = property(lambda self: self._is_calibration_point_updated(BACK_LEFT_POINT),
+                                 lambda self, updated: self._set_calibration_point_updated(BACK_LEFT_POINT, updated))
+    back_right_updated = property(lambda self: self._is_calibration_point_updated(BACK_RIGHT_POINT),
+                                  lambda self, updated: self._set_calibration_point_updated(BACK_RIGHT_POINT, updated))
+
+    # Maps every type of labware component to the functions that build it: (map out its locations, create the object, add it to the labware)
+    LABWARE_COMPONENT_BUILDERS = {
+        LABWARE_CHIP: (map_out_wells, create_chip, Labware_class.add_chip),
+        LABWARE_PLATE: (map_out_pots, create_plate, Labware_class.add_plate),
+    }
+
     def add_labware_component(self, labware_component, component_model, calibration_points):
         """ Add a labware component to the list of calibrated components in the system
 
@@ -537,18 +1032,18 @@ class Coordinator:
             component_model ([str]): model name of the component being added
             calibration_points ([list]): list with the calibration points of the component
         """
+        builder = self.LABWARE_COMPONENT_BUILDERS.get(labware_component)
+        if builder is None:
+            return
+        map_out_locations, create_component, add_component = builder
+
         # This method finds the file named component_model and returns the content of that file as a dictionary
         component_parameters = self.myModelsManager.get_model_parameters(labware_component, component_model)
+        mapped_locations = map_out_locations(component_parameters, calibration_points) # Map out wells/pots within the component
+        new_component = create_component(component_model, component_parameters, mapped_locations) # Create Chip/Plate object with all the internal information it needs
+        add_component(self.myLabware, new_component) # Add component to Chamber
 
-        if (labware_component == LABWARE_CHIP):
-            mapped_well_locations = map_out_wells(component_parameters, calibration_points) # Map out components within the chip
-            new_chip = create_chip(component_model, component_parameters, mapped_well_locations) # Create Chip object with all the internal information it needs
-            self.myLabware.add_chip(new_chip) # Add chip to Chamber
-
-        elif (labware_component == LABWARE_PLATE):
-            mapped_pot_locations = map_out_pots(component_parameters, calibration_points) # Map out components within the plate
-            new_plate = create_plate(component_model, component_parameters, mapped_pot_locations) # Create Plate object with all the internal information it needs
-            self.myLabware.add_plate(new_plate) # Add plate to Chamber
+        self.refresh_slot_to_properties()
 
     def remove_labware_component(self, labware_component, component_index):
         """ Delete a calibrated labware component from the list of current labware components
@@ -563,6 +1058,39 @@ class Coordinator:
         elif (labware_component == LABWARE_PLATE):
             self.myLabware.remove_plate(component_index)
 
+        self.refresh_slot_to_properties()
+
+    def get_slot_of_location(self, location):
+        """ Finds the deck slot that contains a location
+
+        Args:
+            location ([list]): contains three float numbers indicating the 3D coordinate of the location
+
+        Returns:
+            [int]: number of the slot containing the location, None if the location is outside of every slot
+        """
+        for slot_definition in self.deck.slots:
+            slot_x, slot_y = slot_definition['position'][0], slot_definition['position'][1]
+            bounding_box = slot_definition['boundingBox']
+            if slot_x <= location[0] < slot_x + bounding_box['xDimension'] and slot_y <= location[1] < slot_y + bounding_box['yDimension']:
+                return int(slot_definition['id'])
+        return None
+
+    def refresh_slot_to_properties(self):
+        """ Rebuilds the map from deck slot to the properties of the labware component on it, using the first well/pot of each component to find its slot
+        """
+        slot_to_properties = dict()
+        for chip in self.myLabware.chip_list:
+            slot = self.get_slot_of_location(chip.get_location_by_index(0))
+            if slot is not None:
+                slot_to_properties[slot] = {"component_type": LABWARE_CHIP, "properties": chip.export_chip_properties()}
+        for plate in self.myLabware.plate_list:
+            slot = self.get_slot_of_location(plate.get_location_by_index(0))
+            if slot is not None:
+                slot_to_properties[slot] = {"component_type": LABWARE_PLATE, "properties": plate.export_plate_properties()}
+        self._slot_to_properties = slot_to_properties
+        self._labware_summary = None # Every change of the labware goes through here
+
     def set_syringe_model(self, syringe_model):
         """ Set the model of the syringe currenly being operated
 
@@ -570,6 +1098,22 @@ class Coordinator:
             syringe_model ([str]): name of the model of syringe
         """
         self.myLabware.set_syringe_model(syringe_model)
+        self.notify_syringe_changed()
+        self.update_syringe_coordinates()
+        self.invalidate_settings_cache()
+
+    def update_syringe_coordinates(self):
+        """ Loads the plunger coordinates used by the washes (bottom, top, and sweet spot of the syringe) from the current syringe model. 
+        Models that don't specify them keep the default coordinates. This runs once when the syringe model changes, not on every wash
+        """
+        syringe_model = self.myLabware.get_syringe_model()
+        try:
+            syringe_parameters = self.myModelsManager.get_model_parameters(LABWARE_SYRINGE, syringe_model)
+        except (OSError, TypeError):
+            syringe_parameters = dict() # No model file for the syringe, use the defaults
+        self.syringe_bottom_coordinate = syringe_parameters.get("lower_syringe_limit", SYRINGE_BOTTOM)
+        self.syringe_top_coordinate = syringe_parameters.get("upper_syringe_limit", SYRINGE_TOP)
+        self.syringe_sweet_spot_coordinate = syringe_parameters.get("sweetspot_on_syringe", SYRINGE_SWEET_SPOT)
 
     """
     SETTINGS SECTION
@@ -581,48 +1125,51 @@ class Coordinator:
         Returns:
             [dict]: contains a mapping of setting keywords and values for all the relevant settings of the system
         """
-        settings_dict = dict()
+        if self._settings_cache is None:
+            settings_dict = dict()
 
-        settings_dict["coordinate_refresh_rate"] = self.coordinates_refresh_rate
+            settings_dict["coordinate_refresh_rate"] = self.coordinates_refresh_rate
 
-        settings_dict["syringe_model"] = self.get_current_labware()["syringe"]
-        settings_dict["syringe_default_speed"] = self.ot_control.get_step_speed_syringe_motor()
-        
-        settings_dict["xyz_axis_step_size"] = self.ot_control.get_step_size_xyz_motor()
-        settings_dict["xyz_axis_step_speed"] = self.ot_control.get_step_speed_xyz_motor()
-        return settings_dict
+            settings_dict["syringe_model"] = self.myLabware.get_syringe_model()
+            settings_dict["syringe_default_speed"] = self.ot_control.get_step_speed_syringe_motor()
+            
+            settings_dict["xyz_axis_step_size"] = self.ot_control.get_step_size_xyz_motor()
+            settings_dict["xyz_axis_step_speed"] = self.ot_control.get_step_speed_xyz_motor()
+            self._settings_cache = settings_dict
+        return dict(self._settings_cache) # Copy, so that callers can modify it without affecting the cache
+
+    def invalidate_settings_cache(self):
+        """ Forces the next call to get_current_settings() to read all the settings again
+        """
+        self._settings_cache = None
 
     def update_setting(self, property_name, value):
         """ Update the value of a given setting in the system
 
         Args:
-            property_name ([str]): keyword that matches the value of any of the if statements within this method
+            property_name ([str]): keyword that matches any of the keys in SETTING_HANDLERS
             value ([various]): value to be loaded on the setting being updated
         """
-        # Go through all the cases and adjust the appropriate property
-
-        if property_name == "coordinate_refresh_rate":
-            self.coordinates_refresh_rate = float(value)
-
-        elif property_name == "syringe_model":
-            self.set_syringe_model(value)
-        elif property_name == "syringe_default_speed":
-            self.ot_control.set_step_speed_syringe_motor(float(value))
-
-        elif property_name == "xyz_axis_step_size":
-            self.ot_control.set_step_size_xyz_motor(float(value))
-        elif property_name == "xyz_axis_step_speed":
-            self.ot_control.set_step_speed_xyz_motor(float(value))
-        elif property_name == "xyz_axis_gearbox":
-            self.ot_control.set_x_motor_gearbox([float(i) for i in value.split(",")])
-     
-
-        # ADD MORE SETTING HANDLERS BELOW. FORMAT:
-        # elif property_name == "xxxxxxxxxxx":
-        #     pass
-        
+        # Find the handler of the property: (converter for the value, setter that takes the converted value)
+        handler = self.SETTING_HANDLERS.get(property_name)
+        if handler:
+            converter, setter = handler
+            setter(self, converter(value))
+            self.invalidate_settings_cache()
         else:
-            logging.info(f"ERROR: {property_name} PROPERTY NOT LINKED TO ANY MODIFICATION ON THE SYSTEM\n") 
+            logging.info("ERROR: %s PROPERTY NOT LINKED TO ANY MODIFICATION ON THE SYSTEM\n", property_name) 
+
+    # Maps the name of every setting to the conversion applied to the received value and the method that updates it on the system
+    # ADD MORE SETTING HANDLERS BELOW. FORMAT:
+    # "xxxxxxxxxxx": (converter, lambda self, value: ...),
+    SETTING_HANDLERS = {
+        "coordinate_refresh_rate": (float, lambda self, value: setattr(self, "coordinates_refresh_rate", value)),
+        "syringe_model": (str, lambda self, value: self.set_syringe_model(value)),
+        "syringe_default_speed": (float, lambda self, value: self.ot_control.set_step_speed_syringe_motor(value)),
+        "xyz_axis_step_size": (float, lambda self, value: self.ot_control.set_step_size_xyz_motor(value)),
+        "xyz_axis_step_speed": (float, lambda self, value: self.ot_control.set_step_speed_xyz_motor(value)),
+        "xyz_axis_gearbox": (lambda value: [float(i) for i in value.split(",")], lambda self, value: self.ot_control.set_x_motor_gearbox(value)),
+    }
 
     """
     FEEDBACK SECTION
@@ -636,7 +1183,16 @@ class Coordinator:
         Returns:
             [float]: three float numbers rounded to the third decimal point representing X, Y, and Z coordinates
         """
-        return (self.ot_control._position['X'], self.ot_control._position['Y'], self.ot_control._position['Z'])
+        now = time.monotonic()
+        if self._coordinates_cache is None or (now - self._coordinates_cache_time) >= self.coordinates_refresh_rate * COORDINATES_CACHE_FRACTION:
+            self._coordinates_cache = self.ot_control.snapshot_xyz()
+            self._coordinates_cache_time = now
+        return self._coordinates_cache
+
+    def invalidate_coordinates_cache(self):
+        """ Forces the next call to get_current_coordinates() to read the position from the driver
+        """
+        self._coordinates_cache = None
 
     def get_coordinate_refresh_rate(self):
         """ Get the period for refreshing the coordinates in the GUI
@@ -653,14 +1209,18 @@ class Coordinator:
             new_rate ([float]): time elapsed between every instance when the coordinates are refreshed in the GUI
         """
         self.coordinates_refresh_rate = new_rate
+        self.invalidate_settings_cache()
+
+    def get_type_of_labware_by_slot(self, slot):
+        """ Obtains the labware component sitting on a deck slot
 
-    def get_type_of_labware_by_slot(self, slot: int, plate: Plate = None, chip: Chip = None):
-        if plate != None:
-            plate_pot_properties = plate.export_plate_properties()
-            locations = plate_pot_properties["pot_locations"]
-        elif chip != None:
-            dummy = 0
-            # print(chip.well_locations)
+        Args:
+            slot ([int]): number of the slot in the deck
+
+        Returns:
+            [dict]: component type ('c' or 'p') and properties of the component, None if the slot is empty
+        """
+        return self._slot_to_properties.get(int(slot))
 
     def get_depth_of_labware(self, labware: Plate):
         plate_pot_properties = labware.export_plate_properties()
@@ -668,20 +1228,17 @@ class Coordinator:
         return depth
 
     def set_plate_depth(self, plate, depth):
-        # .get_depth_of_labware return a list, so we get the first elements since all of the deoths are the same [0]
-        plate_default_depth = self.get_depth_of_labware(plate)[0]
+        # All of the depths of a plate are the same, so the depth of the first pot is used (no need to export all the plate properties)
+        plate_default_depth = plate.get_pot_depth(0)
         if depth == PLATE_DEPTH:
             # we set the depth here to the distance of the pot minus 1 milimiter so that it has some room. 
             return plate_default_depth - 1
-        # if the depth value is an integer it means that the user wants to dispense or aspirate at a higher point that is smaller in distance than the plates depth, otherwise it would hit the bottom of the plate 
-        elif (type(depth) == int) and (depth < plate_default_depth): 
+        # if the depth value is a number it means that the user wants to dispense or aspirate at a higher point that is smaller in distance than the plates depth, otherwise it would hit the bottom of the plate 
+        if isinstance(depth, numbers.Real):
             if depth < plate_default_depth:
                 return depth
-            else: 
-                print("Number input for depth greater than allowed, using default depth. ")
-                return None 
-        else: 
-            return None
+            print("Number input for depth greater than allowed, using default depth. ")
+        return None
 
     def void_plate_depth(self, plate: Plate, void: bool = False):
         plate.void_plate_depth(void)
@@ -690,24 +1247,94 @@ class Coordinator:
     PROTOCOL METHODS SECTION FOR OT2
         This section defines methods that get called to facilitate reading a script of instructions 
     '''
+    def _aspirate_from_moves(self, amount, source):
+        self.flush_ops()
+        ot_control = self.ot_control # Local bindings, this runs for every step of a protocol
+        conversion_factor = self.get_syringe_conversion_factor()
+        backlash_displacement = BACKLASH_NL * conversion_factor
+        amount_displacement = int(amount) * conversion_factor
+
+        ot_control.move_to(location=source)
+        ot_control.plunger_L_Up(size=backlash_displacement) # Pick up an extra 100 for backlash
+        logging.info("Aspirating %s nL at speed %s nL/s", amount, ASPIRATE_SPEED)
+        ot_control.plunger_L_Up(size=amount_displacement)
+        ot_control.plunger_L_Down(size=backlash_displacement) # Drop off liquid to account for backlash
+        ot_control.set_step_size_syringe_motor(backlash_displacement)
+
+    def _dispense_to_moves(self, amount, to):
+        self.flush_ops()
+        ot_control = self.ot_control
+        amount_displacement = int(amount) * self.get_syringe_conversion_factor()
+
+        ot_control.move_to(location=to)
+        logging.info("Dispensing %s nL at speed %s nL/s", amount, ASPIRATE_SPEED)
+        ot_control.plunger_L_Down(size=amount_displacement)
+        ot_control.set_step_size_syringe_motor(amount_displacement)
+
     def aspirate_from(self, amount, source):
         """ This will go to the position of the source and aspirate an amount in nL"""
-        self.go_to_position(source)
-        self.pick_up_liquid(int(100)) # Pick up an extra 100 for backlash
-        self.aspirate(amount, ASPIRATE_SPEED)
-        self.drop_off_liquid(int(100)) # Drop off liquid to account for backlash
+        if self._batching:
+            self._pending_ops.append((STEP_ASPIRATE, int(amount), source))
+            return
+        self._aspirate_from_moves(amount, source)
         time.sleep(TIME_TO_SETTLE) # Allow some time to the syringe to aspirate
 
     def dispense_to(self, amount, to, depth: int = None):
         """ This will go to the position of the destination and dispense an amount in nL"""
-        self.go_to_position(to)
-        self.dispense(amount, ASPIRATE_SPEED)
+        if self._batching:
+            self._pending_ops.append((STEP_DISPENSE, int(amount), to))
+            return
+        self._dispense_to_moves(amount, to)
         time.sleep(TIME_TO_SETTLE) # Allow some time to the syringe to dispense
-        
+
+    def aspirate_dispense_series(self, amount, source, destinations):
+        """ Delivers the same amount of liquid from one source to every destination. Instead of going back to the source for every
+            destination, the syringe aspirates the liquid for as many destinations as fit in what is left of its travel, then dispenses
+            it one destination after the other
+
+        Args:
+            amount ([int]): volume dispensed on every destination. UNIT: NANOLITERS
+            source ([list]): location of the well or pot to aspirate from
+            destinations ([list]): locations of the wells or pots to dispense to, in order
+
+        Returns:
+            [int]: number of destinations that received liquid. Less than the number of destinations if the syringe ran out of room
+        """
+        amount = int(amount)
+        destinations = list(destinations)
+        if amount <= 0:
+            logging.error("Amount for a series of dispenses has to be positive, received %s nL", amount)
+            return 0
+        remaining = destinations
+        while remaining:
+            destinations_per_draw = min(len(remaining), int(self.get_syringe_room() // amount))
+            if destinations_per_draw == 0:
+                # Asking for more than the syringe can take gets the plunger move refused, and the dispenses would push out liquid that was never drawn
+                logging.error("Not enough room in the syringe to aspirate %s nL, %s of %s destinations left without liquid", amount, len(remaining), len(destinations))
+                break
+            draw, remaining = remaining[:destinations_per_draw], remaining[destinations_per_draw:]
+            self.aspirate_from(amount * len(draw), source)
+            for destination in draw:
+                self.dispense_to(amount, destination)
+        return len(destinations) - len(remaining)
+
+    def get_syringe_room(self):
+        """ Obtains how much liquid can still be aspirated before the plunger reaches the top of the syringe, keeping the extra volume
+            aspirate_from() picks up to account for the backlash
+
+        Returns:
+            [float]: volume that fits in the syringe from the current plunger position. UNIT: NANOLITERS
+        """
+        self.flush_ops() # Steps recorded in a batch() move the plunger, they have to run before its position is read
+        plunger_position = self.ot_control.snapshot_xyzbc()[3] # B axis
+        room = (self.syringe_top_coordinate - plunger_position) / self.get_syringe_conversion_factor()
+        return max(0, room - BACKLASH_NL)
+
     def move_plunger(self, position):
         """ This allows the protocol to move the plunger passed the set limit for manual control, 
             it is important to understand that if the right values are not input correctly for 
             the syringe being used, this could break """
+        self.flush_ops()
         self.ot_control.move({'B': position})
 
     def set_washing_positions(self, clean_water, wash_water, waste_water):
@@ -725,31 +1352,32 @@ class Coordinator:
         """ This is the function that allows the robot to get rid of the contamination on the syringe, 
             by dispensing everything that was left over from before, then it will pick up clean water 
             and end in a postition that allows the protocol to aspirate and dispense without hitting limmmits"""
-        # Go to waste and SYRINGE_BOTTOM
-        self.go_to_position(self.waste_water)
-        self.move_plunger(self.syringe_bottom_coordinate)
-        # Go to wash, SYRINGE_TOP, SYRINGE_BOTTOM
-        self.go_to_position(self.wash_water)
-        self.move_plunger(self.syringe_top_coordinate)
-        self.move_plunger(self.syringe_bottom_coordinate)
-        # Go to clean, SYRINGE_SWEET_SPOT
-        self.go_to_position(self.clean_water)
-        self.move_plunger(self.syringe_sweet_spot_coordinate)
+        self.flush_ops()
+        self.ot_control.execute_move_sequence([
+            # Go to waste and SYRINGE_BOTTOM
+            ('xyz', self.waste_water), ('B', self.syringe_bottom_coordinate),
+            # Go to wash, SYRINGE_TOP, SYRINGE_BOTTOM
+            ('xyz', self.wash_water), ('B', self.syringe_top_coordinate), ('B', self.syringe_bottom_coordinate),
+            # Go to clean, SYRINGE_SWEET_SPOT
+            ('xyz', self.clean_water), ('B', self.syringe_sweet_spot_coordinate),
+        ])
         # Airgap
         self.air_gap()
 
     def mid_wash(self, left_over = STANDARD_LEFT_OVER, cushion_1 = STANDARD_CUSHION_1, cushion_2 = STANDARD_CUSHION_2):
         """ This is a wash that is done to the syringe when picking up and dispensing different liquids"""
-        # Go to waste, dispense left overs
-        self.go_to_position(self.waste_water)
-        self.dispense(left_over)
-        # Go to wash, aspirate amount wanted + Cushion 1, dipense amount wanted + Cushion 2
-        self.go_to_position(self.wash_water)
-        self.aspirate(self.amount_wanted + cushion_1)
-        self.dispense(self.amount_wanted + cushion_2)
-        # Go to clean, go to sweet spot
-        self.go_to_position(self.clean_water)
-        self.move_plunger(self.syringe_sweet_spot_coordinate)
+        self.flush_ops()
+        logging.info("Mid wash: dispensing %s nL of left overs, washing with %s nL", left_over, self.amount_wanted)
+        left_over_displacement, aspirate_displacement, dispense_displacement = self.volumes_to_displacements(
+            [left_over, self.amount_wanted + cushion_1, self.amount_wanted + cushion_2]).tolist()
+        self.ot_control.execute_move_sequence([
+            # Go to waste, dispense left overs
+            ('xyz', self.waste_water), ('B_step', -left_over_displacement),
+            # Go to wash, aspirate amount wanted + Cushion 1, dipense amount wanted + Cushion 2
+            ('xyz', self.wash_water), ('B_step', aspirate_displacement), ('B_step', -dispense_displacement),
+            # Go to clean, go to sweet spot
+            ('xyz', self.clean_water), ('B', self.syringe_sweet_spot_coordinate),
+        ])
         # Airgap
         self.air_gap()
 
@@ -758,78 +1386,197 @@ class Coordinator:
     """
     
 
+    def get_event_loop(self):
+        """ Obtains the event loop shared by all the coroutines of the system, starting it on its own thread if it isn't running
+
+        Returns:
+            [AbstractEventLoop]: running event loop
+        """
+        with self._event_loop_lock:
+            if self._event_loop is None or self._event_loop.is_closed():
+                self._event_loop = asyncio.new_event_loop()
+                self._event_loop_thread = threading.Thread(target=self._event_loop.run_forever, daemon=True, name='Coordinator event loop')
+                self._event_loop_thread.start()
+            return self._event_loop
+
+    def stop_event_loop(self):
+        """ Stops and closes the shared event loop. get_event_loop() starts a new one if a coroutine is sent afterwards
+        """
+        with self._event_loop_lock:
+            if self._event_loop is None or self._event_loop.is_closed():
+                return
+            self._event_loop.call_soon_threadsafe(self._event_loop.stop)
+            self._event_loop_thread.join()
+            self._event_loop.close()
+
+    def run_coroutine(self, coroutine):
+        """ Runs a coroutine on the shared event loop and waits for its result. Coroutines sent from different threads run concurrently on the same loop
+
+        Args:
+            coroutine ([coroutine]): coroutine to be executed
+
+        Returns:
+            [various]: whatever the coroutine returns
+        """
+        self.flush_ops() # Steps recorded in a batch() come before any thermocycler or temperature command
+        return asyncio.run_coroutine_threadsafe(coroutine, self.get_event_loop()).result()
+
     def open_lid(self):
         """ This function opens the lid once the pipette is out of the way and sitting on the slot 3 of the deck,
-            then it sets a flag so that other functions may know that the thermocycler lid is opened"""
-        if self.ot_control.tc_lid_flag != 'open':
-            self.go_to_deck_slot(PIPPETE_POSITION_WHEN_MOVING_TC_LID) # for avoiding collitions
-        asyncio.run(self.tc_control.open())
+            then it sets a flag so that other functions may know that the thermocycler lid is opened.
+            The command is sent every time: the flag only reflects what this class last asked for, the lid may have been moved (or the thermocycler
+            power-cycled) since then"""
+        self.park_for_tc_lid()
+        self.run_coroutine(self.tc_control.open())
         self.ot_control.set_tc_lid_flag('open')
 
     def close_lid(self):
         """ This function closes the lid once the pipette is out of the way and sitting on the slot 3 of the deck,
             then it sets a flag so that other functions may know that the thermocycler lid is closed"""
-        self.go_to_deck_slot(PIPPETE_POSITION_WHEN_MOVING_TC_LID) # for avoiding collitions
-        asyncio.run(self.tc_control.close())
+        self.park_for_tc_lid()
+        self.run_coroutine(self.tc_control.close())
         self.ot_control.set_tc_lid_flag('closed')
 
     def open_close_lid(self):
         """ This function closes the lid once the pipette is out of the way and sitting on the slot 3 of the deck,
             then it sets a flag so that other functions may know that the thermocycler lid is closed"""
 
-        self.go_to_deck_slot(PIPPETE_POSITION_WHEN_MOVING_TC_LID) # for avoiding collitions
+        self.park_for_tc_lid()
         if self.ot_control.tc_lid_flag == 'open':
-            asyncio.run(self.tc_control.close())
+            self.run_coroutine(self.tc_control.close())
             self.ot_control.set_tc_lid_flag('closed')
         else:
-            asyncio.run(self.tc_control.open())
+            self.run_coroutine(self.tc_control.open())
             self.ot_control.set_tc_lid_flag('open')
 
 
     def deactivate_all(self):
         """ This function deactivates both, the lid and the block of the thermocycler"""
-        asyncio.run(self.tc_control.deactivate_all())
+        self.run_coroutine(self.tc_control.deactivate_all())
     
     def deactivate_lid(self):
         """ This function deactivates the lid of the thermocycler"""
-        asyncio.run(self.tc_control.deactivate_lid())
+        self.run_coroutine(self.tc_control.deactivate_lid())
 
     def deactivate_block(self):
         """ This function deactivates the block of the thermocycler"""
-        asyncio.run(self.tc_control.deactivate_block())
+        self.run_coroutine(self.tc_control.deactivate_block())
 
     def set_temperature(self ,temp: float, hold_time:  float = None):
         """ This function sets the temperature of the thermocycler with a holding time in minutes."""
-        asyncio.run(self.tc_control.set_temperature(temp, hold_time))
+        self.run_coroutine(self.tc_control.set_temperature(temp, hold_time))
 
     def set_lid_temp(self, temp: float):
         
-        asyncio.run(self.tc_control.set_lid_temperature(temp))
+        self.run_coroutine(self.tc_control.set_lid_temperature(temp))
 
     def tc_disconnect(self):
         self.tc_control.disconnect()
 
     def set_block_temp(self, target_temp, holding_time_in_minutes):
         hold_time_in_secs = holding_time_in_minutes * 60
+        # The hold time is given to the thermocycler firmware, here we only wait for the target and for the hold to finish
         self.set_temperature(temp=target_temp, hold_time=hold_time_in_secs)
-        current_temp = float(self.tc_control.get_block_temp())
         logging.info("Checking temperature of the block")
-        logging.info(f"Current_temp = {current_temp} [C] ---- Target Temperature = {target_temp} [C]")
-        
-        # While the target temperature has not been reached within a 1 of allowance check every five seconds and then continue to hold for specified time
-        while (float(current_temp) < (float(target_temp) - 1)) or (float(current_temp) > (float(target_temp) + 1)):
-            current_temp = self.tc_control.get_block_temp()
-            time.sleep(5)
-            logging.info(f"Current_temp = {current_temp} [C]")
-        logging.info("Target temperature {current_temp} [C] reached")
-
-        logging.info(f"Holding for {holding_time_in_minutes} minutes.")
-        min_count = 0 # init for tcounting the minutes to hold
-
-        # here we start the holding time. We check every half a minute and exit the loop when the time holding is equal than the time to hold
-        while float(min_count) < float(holding_time_in_minutes):
-            time.sleep(30)
-            min_count = min_count + 0.5
+        self.run_coroutine(self.reach_and_hold_temperature(self.tc_control.get_block_temp, target_temp, hold_time_in_secs))
+
+    def run_tc_profile(self, steps, repeats = 1):
+        """ Runs a thermocycler profile: every step sets the block to a temperature and holds it, and the whole list of steps is repeated.
+            The profile is sent to the event loop as a single coroutine, instead of one call per step
+
+        Args:
+            steps ([list]): (target_temp, holding_time_in_minutes) for every step of the cycle. UNITS: CELSIUS, MINUTES
+            repeats ([int]): number of times the cycle is run
+        """
+        self.run_coroutine(self.thermocycle(steps, repeats))
+
+    async def thermocycle(self, steps, repeats):
+        """ Coroutine with the steps of run_tc_profile(). Run it with run_coroutine()
+
+        Args:
+            steps ([list]): (target_temp, holding_time_in_minutes) for every step of the cycle. UNITS: CELSIUS, MINUTES
+            repeats ([int]): number of times the cycle is run
+        """
+        for cycle in range(repeats):
+            logging.info("Thermocycler profile: cycle %s of %s", cycle + 1, repeats)
+            for target_temp, holding_time_in_minutes in steps:
+                hold_time_in_secs = holding_time_in_minutes * 60
+                await self.tc_control.set_temperature(target_temp, hold_time_in_secs)
+                await self.reach_and_hold_temperature(self.tc_control.get_block_temp, target_temp, hold_time_in_secs)
+
+    async def wait_for_temperature(self, read_temperature, target_temp, tolerance = TEMPERATURE_TOLERANCE, poll_interval = TEMPERATURE_POLL_INTERVAL):
+        """ Waits until a module reaches a target temperature (within the given tolerance). The readings are spread according to how fast
+            the temperature is approaching the target: few readings while it's far away and one every poll_interval when it's about to arrive
+
+        Args:
+            read_temperature ([function]): function that returns the current temperature of the module. UNIT: CELSIUS
+            target_temp ([float]): temperature to reach. UNIT: CELSIUS
+            tolerance ([float]): allowed difference between the current and target temperatures. UNIT: CELSIUS
+            poll_interval ([float]): shortest time between two readings of the temperature. UNIT: SECONDS
+        """
+        target_temp = float(target_temp)
+        loop = asyncio.get_running_loop()
+        # The readings are blocking serial round trips, they run on an executor so that the shared event loop keeps serving other coroutines
+        read_time = time.monotonic()
+        current_temp = float(await loop.run_in_executor(None, read_temperature))
+        logging.info("Current_temp = %s [C] ---- Target Temperature = %s [C]", current_temp, target_temp)
+        interval = poll_interval
+        failed_reads = 0
+        while abs(current_temp - target_temp) > tolerance:
+            # The interval counts from when the last reading was requested, a slow answer from the module doesn't push the next one back
+            await asyncio.sleep(max(0, read_time + interval - time.monotonic()))
+            request_time = time.monotonic()
+            try:
+                new_temp = float(await loop.run_in_executor(None, read_temperature))
+            except (SerialException, SerialNoResponse) as e:
+                # A single timeout on the serial port shouldn't end the wait, the module keeps ramping on its own
+                failed_reads += 1
+                if failed_reads >= TEMPERATURE_READ_RETRIES:
+                    raise
+                logging.warning("Could not read the temperature (%s), trying again", e)
+                read_time, interval = request_time, poll_interval
+                continue
+            failed_reads = 0
+            previous_temp, previous_time = current_temp, read_time
+            current_temp, read_time = new_temp, request_time
+            logging.info("Current_temp = %s [C]", current_temp)
+            interval = self.next_temperature_poll_interval(previous_temp, previous_time, current_temp, read_time, target_temp, tolerance, poll_interval)
+        logging.info("Target temperature %s [C] reached", current_temp)
+
+    def next_temperature_poll_interval(self, previous_temp, previous_time, current_temp, current_time, target_temp, tolerance, poll_interval):
+        """ Estimates when the temperature will be within the tolerance of the target from the last two readings and returns how long to wait
+            before reading it again, a fraction of that estimate bounded by poll_interval and MAX_TEMPERATURE_POLL_INTERVAL
+
+        Returns:
+            [float]: time to wait before the next reading of the temperature. UNIT: SECONDS
+        """
+        elapsed = current_time - previous_time
+        remaining = abs(current_temp - target_temp) - tolerance
+        approach_rate = (abs(previous_temp - target_temp) - abs(current_temp - target_temp)) / elapsed if elapsed > 0 else 0 # C/s towards the target
+        if approach_rate <= 0:
+            return poll_interval # Not approaching (yet), keep a close eye on it
+        expected_time_left = remaining / approach_rate
+        return min(MAX_TEMPERATURE_POLL_INTERVAL, max(poll_interval, expected_time_left * TEMPERATURE_POLL_FRACTION))
+
+    async def reach_and_hold_temperature(self, read_temperature, target_temp, hold_time_in_secs):
+        """ Waits until a module reaches a target temperature and then waits for the holding time
+
+        Args:
+            read_temperature ([function]): function that returns the current temperature of the module. UNIT: CELSIUS
+            target_temp ([float]): temperature to reach. UNIT: CELSIUS
+            hold_time_in_secs ([float]): time to hold the temperature once it has been reached. UNIT: SECONDS
+        """
+        await self.wait_for_temperature(read_temperature, target_temp)
+        logging.info("Holding for %s minutes.", hold_time_in_secs / 60)
+        # Sleep until the deadline, only waking up every HOLD_PROGRESS_LOG_INTERVAL to report the time left. Measuring against the clock keeps
+        # the time spent logging (or a late wake up) from adding up over a long hold
+        deadline = time.monotonic() + float(hold_time_in_secs)
+        remaining_secs = deadline - time.monotonic()
+        while remaining_secs > 0:
+            await asyncio.sleep(min(HOLD_PROGRESS_LOG_INTERVAL, remaining_secs))
+            remaining_secs = deadline - time.monotonic()
+            if remaining_secs > 0:
+                logging.info("Holding: %s minutes left.", round(remaining_secs / 60, 2))
         logging.info("Holding time done. Proceeding to complete next step.")
 
     """
@@ -838,29 +1585,13 @@ class Coordinator:
 
     def set_tempdeck_temp(self, celcius, holding_time_in_minutes):
         hold_time_in_secs = holding_time_in_minutes * 60
+        self.flush_ops()
         self.td_control.start_set_temperature(celcius)
-        current_temp = self.get_tempdeck_temp()
         logging.info("Checking temperature of the TempDeck")
-        logging.info(f"Current_temp = {current_temp} [C] ---- Target Temperature = {celcius} [C]")
-
-        # While the target temperature has not been reached within a 1 of allowance check every five seconds and then continue to hold for specified time
-        while (float(current_temp) < (float(celcius) - 1)) or (float(current_temp) > (float(celcius) + 1)):
-            current_temp = self.get_tempdeck_temp()
-            time.sleep(5)
-            logging.info(f"Current_temp = {current_temp} [C]")
-            # print(self.check_tempdeck_status())
-        logging.info("Target temperature {current_temp} [C] reached")
-
-        logging.info(f"Holding for {holding_time_in_minutes} minutes.")
-        min_count = 0 # init for tcounting the minutes to hold
-
-        # here we start the holding time. We check every half a minute and exit the loop when the time holding is equal than the time to hold
-        while float(min_count) < float(holding_time_in_minutes):
-            time.sleep(30)
-            min_count = min_count + 0.5
-        logging.info("Holding time done. Proceeding to complete next step.")
+        self.run_coroutine(self.reach_and_hold_temperature(self.get_tempdeck_temp, celcius, hold_time_in_secs))
 
     def deactivate_tempdeck(self):
+        self.flush_ops()
         self.td_control.deactivate()
 
     def get_tempdeck_temp(self):
@@ -890,19 +1621,33 @@ class Coordinator:
 
     def connect_all(self):
         """This method connects the modules connected to the computer"""
-        try:
+        # Closing a serial port takes time, so the modules are only disconnected first when one of them is still connected
+        if any(module is not None and module.is_connected() for module in (self._tc_control, self._ot_control, self._td_control)):
             self.disconnect_all()
+        # Each module is connected on its own so that one failing module doesn't keep the others disconnected
+        try:
             self.tc_control._connection = self.tc_control._connect_to_port()
+        except (TypeError, SerialException):
+            print("Not able to connect back to the thermocycler")
+        try:
             self.ot_control.connect_driver()
+        except (TypeError, SerialException):
+            print("Not able to connect back to the OT2")
+        try:
             self.td_control.connect(self.ot_control._port)
-        except TypeError:
-            print("Not able to disconnect and connect back to the modules")
+        except (TypeError, SerialException):
+            print("Not able to connect back to the tempdeck")
 
     def disconnect_all(self):
         """This method disconnects the modules connected to the computer"""
-        self.tc_disconnect()
-        self.ot_control.disconnect()
-        self.td_control.disconnect()
+        # Modules that were never created don't need to be disconnected
+        if self._tc_control is not None and self._tc_control.is_connected():
+            self.tc_disconnect()
+        if self._ot_control is not None and self._ot_control.is_connected():
+            self._ot_control.disconnect()
+        if self._td_control is not None and self._td_control.is_connected():
+            self._td_control.disconnect()
+        self.stop_event_loop()
 
     def end_of_protocol(self):
         self.go_to_deck_slot('3')
@@ -0,0 +1,28 @@
+"""
+DIRECTORY CACHE MODULE
+    This module keeps the list of files of the folders the system reads repeatedly (saved labware, models, protocols).
+    A folder is only read again from disk when its modification time changes, which happens whenever a file is added,
+    removed, or renamed inside of it.
+"""
+
+import os
+
+_listing_cache = dict() # path -> (modification time of the folder in ns, list of file names)
+
+# This returns the names of the files (not folders) inside of the given path
+def list_files(path):
+    modification_time = os.stat(path).st_mtime_ns
+    cached = _listing_cache.get(path)
+    if cached is None or cached[0] != modification_time:
+        with os.scandir(path) as entries:
+            file_names = [entry.name for entry in entries if entry.is_file()]
+        cached = (modification_time, file_names)
+        _listing_cache[path] = cached
+    return list(cached[1]) # Copy, so that callers can modify the list without affecting the cache
+
+# This forgets the cached list of files of a path (or of every path if none is specified)
+def clear_cache(path = None):
+    if path is None:
+        _listing_cache.clear()
+    else:
+        _listing_cache.pop(path, None)
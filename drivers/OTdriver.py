@@ -19,6 +19,10 @@ from opentrons.drivers.smoothie_drivers.driver_3_0 import SmoothieDriver_3_0_0 a
 from opentrons.config.robot_configs import build_config
 from serial.tools import list_ports
 import os
+import logging
+import queue
+import threading
+from operator import itemgetter
 from constants import RUNNING_APP_FOR_REAL
 
 X_MAX= 418
@@ -50,8 +54,13 @@ SPEED = 300
 STEP_SPEED = 100
 SLOW_SPEED = 15
 MOVE_TO_SPEED = 70
+MAX_PENDING_COMMANDS = 2 # Commands allowed to wait for the serial link before new joystick commands get dropped
 MEDIUM_SPEED = 100
 
+# Read several axes of the position dictionary in a single call (the dictionary itself belongs to the Smoothie driver)
+XYZ_POSITION = itemgetter('X', 'Y', 'Z')
+XYZBC_POSITION = itemgetter('X', 'Y', 'Z', 'B', 'C')
+
 X_MAX_SPEED = 600
 Y_MAX_SPEED = 400
 Z_MAX_SPEED = 125
@@ -97,11 +106,60 @@ class OT2_nanotrons_driver(SM):
         self.i = MIDDLE_STEP
         self.tc_flag = True
         self.tc_lid_flag = 'Open'
+        # Pool of pending commands served by a single writer thread so that the joystick loop doesn't block on the serial link
+        self._command_pool = queue.Queue(maxsize=MAX_PENDING_COMMANDS)
+        self._last_command = None
+        self._command_writer = None
         if RUNNING_APP_FOR_REAL:
             self.connect_driver()
         else:
             print("Not connected to the OT port")
 
+# Command pool
+
+    def submit(self, op, *args, droppable=True) -> bool:
+        """
+        Queues a command to be executed by the writer thread. Droppable commands (e.g. the repeats of a held 
+        stick) get dropped if the pool is full, and coalesced if they are the same as the last command still waiting.
+        Commands that are not droppable wait for room in the pool, so a single press is never lost.
+        Returns True when the command was queued.
+        """
+        command = (op, args)
+        if droppable and command == self._last_command and not self._command_pool.empty():
+            return False # Same command is still pending, e.g. a held stick
+        self._start_command_writer()
+        if droppable:
+            try:
+                self._command_pool.put_nowait(command)
+            except queue.Full:
+                return False
+        else:
+            self._command_pool.put(command)
+        self._last_command = command
+        return True
+
+    def wait_for_commands(self):
+        # Blocks until every queued command has been sent to the robot
+        self._start_command_writer()
+        self._command_pool.join()
+
+    def _start_command_writer(self):
+        if self._command_writer is None or not self._command_writer.is_alive():
+            self._command_writer = threading.Thread(target=self._serve_commands, daemon=True,
+                                                    name='OT2 command writer')
+            self._command_writer.start()
+
+    def _serve_commands(self):
+        while True:
+            op, args = self._command_pool.get()
+            try:
+                op(*args)
+            except Exception:
+                # Any failure is logged and the writer keeps serving, otherwise wait_for_commands() would never return
+                logging.exception("Command %s failed", op.__name__)
+            finally:
+                self._command_pool.task_done()
+
 # Functions that help movements
         
     def check_for_valid_move(self, pos, axis, size) -> bool:
@@ -342,6 +400,12 @@ class OT2_nanotrons_driver(SM):
     def get_nL(self):
         return self.nL
 
+    def snapshot_xyz(self):
+        return XYZ_POSITION(self._position)
+
+    def snapshot_xyzbc(self):
+        return XYZBC_POSITION(self._position)
+
     def set_step_size_xyz_motor(self, new_step_size):
         self.xyz_step_size = new_step_size
 
@@ -487,6 +551,30 @@ class OT2_nanotrons_driver(SM):
                 if(self.check_for_valid_move(z, 'Z', None)):
                     self.move({'Z': z}, speed= MOVE_TO_SPEED)
 
+    def execute_move_sequence(self, moves):
+        """
+        Executes a planned list of moves back to back. Each move is a tuple:
+            ('xyz', location)       -> safe move to an [x, y, z] location (same as move_to)
+            ('B', coordinate)       -> move the left plunger to an absolute coordinate
+            ('B_step', displacement) -> move the left plunger by a displacement (positive aspirates, negative dispenses)
+        Consecutive absolute plunger moves to the same coordinate are only sent once.
+        """
+        last_plunger_target = None
+        for kind, value in moves:
+            if kind == 'xyz':
+                self.move_to(value)
+                last_plunger_target = None
+            elif kind == 'B':
+                if value != last_plunger_target:
+                    self.move({'B': value})
+                    last_plunger_target = value
+            elif kind == 'B_step':
+                if value > 0:
+                    self.plunger_L_Up(size=value)
+                elif value < 0:
+                    self.plunger_L_Down(size=-value)
+                last_plunger_target = None
+
     def change_to_L_axis(self, dummyarg):
         # This function allows the controller to have more functionality
         self.side = LEFT
@@ -273,7 +273,7 @@ class TempDeck:
         # Smoothieware returns error state if a switch was hit while moving
         if (ERROR_KEYWORD in ret_code.lower()) or \
                 (ALARM_KEYWORD in ret_code.lower()):
-            log.error(f'Received error message from Temp-Deck: {ret_code}')
+            log.error('Received error message from Temp-Deck: %s', ret_code)
             raise TempDeckError(ret_code)
 
         return ret_code.strip()
@@ -3,18 +3,33 @@ FLAG CLASS
     The purpose of this class is to implement flags that allow for
     going around scope issues with declaring new variables vs assigning
     new values to existing variables on a bigger scope. See the 
-    sending_syringe flag in web_app to see its utility
+    sending_syringe flag in web_app to see its utility.
+    Threads can also block until a flag takes a value (wait_for) instead
+    of reading it in a loop with a sleep
 """
 
+import threading
+
 class Flag:
     def __init__(self):
         self.value = False
+        self.value_changed = threading.Condition() # Notified every time the value of the flag is assigned
 
     def activate(self):
-        self.value = True
+        self.set_value(True)
 
     def deactivate(self):
-        self.value = False
+        self.set_value(False)
+
+    def set_value(self, value):
+        with self.value_changed:
+            self.value = value
+            self.value_changed.notify_all()
 
     def read(self):
-        return self.value
\ No newline at end of file
+        return self.value
+
+    # Blocks until the flag has the given value or the timeout (in seconds) runs out. Returns True if the flag has the value
+    def wait_for(self, value, timeout = None):
+        with self.value_changed:
+            return self.value_changed.wait_for(lambda: self.value == value, timeout)
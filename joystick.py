@@ -7,6 +7,8 @@ JOYSTICK CLASS
 
 import pygame
 import inspect
+import queue
+from collections import namedtuple
 
 # JOYSTICK BUTTONS MAPPING
 BUTTONS_DICT_W = { 0:"A", 1:"B", 2:"X", 3:"Y", 4:"LB", 
@@ -55,6 +57,16 @@ RASPBERRY_OS = "r"
 TRIGGERS_AXIS = 2
 ERRONEOUS_AXES = [0, 1, 3, 4] # These are the indeces of the two axes that correspond to each joystick in the Xbox controller
 THRESHOLD = 0.4 # This is the minimum value a joystick axes has to be to be read, otherwise it's considered 0
+DELIVERED_AXES = 5 # Only the first 5 axes are delivered, the 6th index is just garbage from the pygame library
+
+# Kinds of input changes pushed by listen() onto the event queue
+AXIS_EVENT = "axis"
+BUTTON_EVENT = "button"
+HAT_EVENT = "hat"
+STOP_EVENT = "stop" # Pushed once when listen() returns, so that the consumer knows no more events are coming
+
+# An input change: kind of element, element (axis index, button name, or hat name) and its new value (0 when released)
+JoystickEvent = namedtuple("JoystickEvent", ["kind", "element", "value"])
 
 class XboxJoystick:
     """
@@ -81,6 +93,7 @@ class XboxJoystick:
         
         self.hats = [0, 0, 0, 0] # Each hat (arrow) has a state
         self.keep_listening = False
+        self.event_queue = queue.Queue() # listen() pushes a JoystickEvent every time an element changes state so that the consumer doesn't have to poll
         
         self.axes_direction = [1, 1, 1, 1, 1, 1] # This is a multiplier to the argument of the function that moves the motor associated to the axis. It can be inverted depending on the user preferences
         self.bumpers_direction = 1
@@ -91,6 +104,15 @@ class XboxJoystick:
         self.hats = [0, 0, 0, 0] # Each hat state (Arrow buttons)
         self.axes = [0, 0, 0, 0, 0, 0] # Each axis state
         self.keep_listening = False
+        self.clear_events()
+
+    # Drops the events that haven't been consumed yet
+    def clear_events(self):
+        while True:
+            try:
+                self.event_queue.get_nowait()
+            except queue.Empty:
+                return
 
     """
     GETTERS
@@ -131,6 +153,10 @@ class XboxJoystick:
     """
     READING SECTION
     """
+    # This returns True if any button, hat, or axis (ignoring the 6th garbage axis) is away from its natural position
+    def has_active_input(self):
+        return any(self.buttons) or any(self.hats) or any(self.axes[:DELIVERED_AXES])
+
     # Read the state of the axes in the joystick
     def read_axes(self):
         self.axes = [round(self.joystick.get_axis(i), 3) for i in range(self.joystick.get_numaxes())] # rounded to 1 decimal point bc the stick axes are never actually 0 (they have an error that starts on the second decimal point of the reading)
@@ -219,7 +245,7 @@ class XboxJoystick:
     # This returns a dictionary that represent all the axes that are currently not in their natural position
     def deliver_axes(self):
         axes_to_deliver = {}
-        for axis in range(5): # This ignores the 6th index which is just garbage from the pygame library
+        for axis in range(DELIVERED_AXES): # This ignores the 6th index which is just garbage from the pygame library
             if self.axes[axis] != 0:
                 # print("deliver_axes")
                 axes_to_deliver[axis] = self.axes[axis]
@@ -228,32 +254,42 @@ class XboxJoystick:
     """
     LISTEN SECTION
     """
-    # Listens to the controller's input
+    # This returns the string that represents a button given its index in self.buttons
+    def get_button_name(self, button_index):
+        if self.os == WINDOWS_OS:
+            return BUTTONS_DICT_W[button_index]
+        elif self.os == RASPBERRY_OS:
+            return BUTTONS_DICT_R[button_index]
+
+    # Listens to the controller's input. Every element that changes its state gets pushed onto self.event_queue
     def listen(self):
         self.reset_values() # reset the values read from the last call for listen_one()
         self.keep_listening = True
-        while (self.keep_listening):
-            # EVENT DETECTION AND PRINT
-            # Possible joystick actions: JOYAXISMOTION, JOYBALLMOTION, JOYBUTTONDOWN, JOYBUTTONUP, JOYHATMOTION
-            for event in pygame.event.get(): # User did something.
-                if event.type == pygame.JOYBUTTONDOWN:
-                    self.read_buttons()
-                    # print(self.get_buttons())
-                    # print(self.deliver_buttons())
-
-                elif event.type == pygame.JOYBUTTONUP:
-                    self.read_buttons()
-                    # print(self.deliver_buttons())
-
-                elif event.type == pygame.JOYAXISMOTION:
-                    self.read_axes()
-                    # print(self.deliver_axes())
-                    # print(self.get_axes())
-
-                elif event.type == pygame.JOYHATMOTION:
-                    self.read_hats()
-                    # print(self.deliver_hats())
-                    # print(self.to_string_hats())
+        try:
+            while (self.keep_listening):
+                # EVENT DETECTION AND PRINT
+                # Possible joystick actions: JOYAXISMOTION, JOYBALLMOTION, JOYBUTTONDOWN, JOYBUTTONUP, JOYHATMOTION
+                for event in pygame.event.get(): # User did something.
+                    if event.type == pygame.JOYBUTTONDOWN or event.type == pygame.JOYBUTTONUP:
+                        self.read_buttons()
+                        self.event_queue.put(JoystickEvent(BUTTON_EVENT, self.get_button_name(event.button), self.buttons[event.button]))
+
+                    elif event.type == pygame.JOYAXISMOTION:
+                        previous_axes = self.axes
+                        self.read_axes()
+                        # The sticks report tiny motions all the time, only an axis leaving or returning to its natural position is an event
+                        for axis in range(DELIVERED_AXES):
+                            if (previous_axes[axis] != 0) != (self.axes[axis] != 0):
+                                self.event_queue.put(JoystickEvent(AXIS_EVENT, axis, self.axes[axis]))
+
+                    elif event.type == pygame.JOYHATMOTION:
+                        previous_hats = list(self.hats)
+                        self.read_hats()
+                        for hat in range(len(self.hats)):
+                            if previous_hats[hat] != self.hats[hat]:
+                                self.event_queue.put(JoystickEvent(HAT_EVENT, HATS_DICT[hat], self.hats[hat]))
+        finally:
+            self.event_queue.put(JoystickEvent(STOP_EVENT, None, 0)) # Wakes up the consumer even if listening ended because of an error
 
     # Sets to False the boolean that controls the listen() loop
     def stop_listening(self, dummy_arg):
@@ -13,11 +13,18 @@ from drivers.OTdriver import *
 from joystick import *
 import inspect
 import json
+import os
 import sys
 from pathlib import Path
+try:
+    import orjson as fast_json
+except ImportError:
+    fast_json = json  # type: ignore
 
 CURRENT_DIRECTORY = str(Path().absolute()) + '\\controller_profiles\\'
 
+_loaded_profiles = {} # Cache of the profile files already read (path -> (modification time, mapping)) so re-instantiating a Profile skips the disk
+
 class Profile:
     def __init__(self, file):
 
@@ -65,10 +72,15 @@ class Profile:
         return self.hats_mapping
 
     # This returns the function associated to the provided string name. It searches on all the classes specified inside of the method
+        # Unknown names raise a ValueError when the profile is loaded instead of failing later when the joystick element is pressed
     def find_method(self, function_name):
-        method = getattr(OT2_nanotrons_driver, function_name, "NOT_FOUND")
-        if method == "NOT_FOUND":
-            method = getattr(XboxJoystick, function_name, "NOT_FOUND")
+        if function_name == self.nothing.__name__:
+            return self.nothing
+        method = getattr(OT2_nanotrons_driver, function_name, None)
+        if method is None:
+            method = getattr(XboxJoystick, function_name, None)
+        if method is None:
+            raise ValueError(f"Unbound joystick action {function_name}")
         return method
 
     # This returns the amount of arguments needed by a method (this is not yet in use but might come in handy to not have the need for dummy arguments in function definitions that don't take arguments)
@@ -104,8 +116,14 @@ class Profile:
             path_to_file = stripped + file_name
         else:
             path_to_file += "\\" + file_name
-        json_path = open(path_to_file, "r")
-        myFile = json.load(json_path)
+        modification_time = os.stat(path_to_file).st_mtime_ns
+        cached = _loaded_profiles.get(path_to_file)
+        if cached is not None and cached[0] == modification_time:
+            myFile = cached[1]
+        else: # Not read yet, or the file was edited (i.e. re-exported) since it was read
+            with open(path_to_file, "rb") as json_file:
+                myFile = fast_json.loads(json_file.read())
+            _loaded_profiles[path_to_file] = (modification_time, myFile)
         for line in myFile.items():
             key, value = line
             if key in self.buttons_mapping.keys():
@@ -10,7 +10,14 @@ from plate import Plate
 import sys
 
 import os
+import re
 import json
+import copy
+from directory_cache import list_files
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 RELATIVE_PATH_L = "/saved_labware"
 RELATIVE_PATH_W = "\\saved_labware"
@@ -19,12 +26,16 @@ LABWARE_PLATE = "p"
 LINUX_OS = 'posix'
 WINDOWS_OS = 'nt'
 JSON_EXTENTION = '.json'
+CONTAINER_DESCRIPTION = re.compile(r"([cp]) (\d)(.+)") # "[component] [component_index][well/pot nickname]" i.e. "p 1E3"
 
 class Labware_class:
     def __init__(self):
         self.chip_list = []
         self.plate_list = []
         self.syringe_model = []
+        # Cached views of the labware, they are rebuilt only after one of the setters below modifies the labware
+        self.labware_dictionary_cache = None
+        self.current_labware_cache = None
 
     """
     SETTERS SECTION
@@ -32,30 +43,42 @@ class Labware_class:
     def add_chip(self, new_chip):
         # add new_chip to the list of chips
         self.chip_list.append(new_chip)
+        self.labware_changed()
 
     def remove_chip(self, chip_index):
         # print(f"Chips: {self.chip_list}")
         self.chip_list.pop(chip_index)
+        self.labware_changed()
 
 
     def add_plate(self, new_plate):
         # add new_plate to the list of chips
         self.plate_list.append(new_plate)
+        self.labware_changed()
 
     def remove_plate(self, plate_index):
         # print(f"Plates: {self.plate_list}")
         self.plate_list.pop(plate_index)
+        self.labware_changed()
 
     def reset_chip_list(self):
         # print(f"Reseting the chips\n Chips: {self.chip_list}")
         self.chip_list.clear()
+        self.labware_changed()
     
     def reset_plate_list(self):
         # print(f"Reseting the plates\n Plates: {self.plate_list}")
         self.plate_list.clear()
+        self.labware_changed()
 
     def set_syringe_model(self, model_name):
         self.syringe_model = model_name
+        self.labware_changed()
+
+    def labware_changed(self):
+        # Forget the cached views of the labware so that they get rebuilt the next time they are requested
+        self.labware_dictionary_cache = None
+        self.current_labware_cache = None
 
     """
     GETTERS SECTION
@@ -82,11 +105,15 @@ class Labware_class:
         return models
 
     def get_current_labware(self):
-        labware = dict()
-        labware["chips"] = self.get_chip_models()
-        labware["plates"] = self.get_plate_models()
-        labware["syringe"] = self.get_syringe_model()
-        return labware
+        if self.current_labware_cache is None:
+            labware = dict()
+            labware["chips"] = self.get_chip_models()
+            labware["plates"] = self.get_plate_models()
+            labware["syringe"] = self.get_syringe_model()
+            self.current_labware_cache = labware
+        # Callers modify the dictionaries they receive, so they get a copy of the cached ones
+        labware = self.current_labware_cache
+        return {"chips": dict(labware["chips"]), "plates": dict(labware["plates"]), "syringe": labware["syringe"]}
 
     def get_well_location(self, chip, well_nickname):
         location = self.chip_list[chip].get_location_by_nickname(well_nickname)
@@ -98,17 +125,16 @@ class Labware_class:
 
     # String input looks like: "p 1E3" or "c 1B3" : "[component] [component_index][well/pot nickname]"
     def check_well_pot_existence(self, container):
-        # Unpack variables from the input string
-        component = container.split()[0]
-        index = int(container.split()[1][0])
-        nickname = container.split()[1][1:]
+        # Unpack variables from the input string, malformed strings don't describe any container
+        match = CONTAINER_DESCRIPTION.fullmatch(container)
+        if match is None:
+            print(f"Container description not understood: {container}")
+            return False
+        component, index, nickname = match.groups()
 
         # Verify existence of the container specified
-        if component == LABWARE_CHIP:
-            return self.chip_list[index].verify_nickname_existence(nickname)
-
-        elif component == LABWARE_PLATE:
-            return self.plate_list[index].verify_nickname_existence(nickname)
+        components = self.chip_list if component == LABWARE_CHIP else self.plate_list
+        return components[int(index)].verify_nickname_existence(nickname)
 
     """
     SAVE/LOAD LABWARE 
@@ -160,6 +186,9 @@ class Labware_class:
     """
     # This method parses the list of chips and plates and outputs a dictionary with all the parameters of all the labware components
     def labware_to_dictionary(self):
+        # Like get_current_labware(), callers get a copy so that modifying it doesn't change the cached dictionary
+        if self.labware_dictionary_cache is not None:
+            return copy.deepcopy(self.labware_dictionary_cache)
         labware_dictionary = dict()
         labware_dictionary["chips"] = list()
         labware_dictionary["plates"] = list()
@@ -173,7 +202,8 @@ class Labware_class:
         for plate in self.plate_list:
             plate_properties = plate.export_plate_properties()
             labware_dictionary["plates"].append(plate_properties)
-        return labware_dictionary
+        self.labware_dictionary_cache = labware_dictionary
+        return copy.deepcopy(labware_dictionary)
 
     def dictionary_to_labware(self, labware_dictionary):        
         chips_list = labware_dictionary["chips"] # This is a list of dictionaries, each of which containes prooperties for a given chip
@@ -187,6 +217,7 @@ class Labware_class:
         for plate_properties in plates_list:
             new_plate = Plate(plate_properties=plate_properties)
             self.plate_list.append(new_plate)
+        self.labware_changed()
             
     def get_path_to_saved_labware_folder(self):
         current_path = os.getcwd() # Returns a string representing the location of this file
@@ -201,24 +232,25 @@ class Labware_class:
         folder_path = self.get_path_to_saved_labware_folder()
         file_path = os.path.join(folder_path, file_name + JSON_EXTENTION) # Add the name of the file of interest to that path string
 
-        # Create a json file
-        output_file = open(file_path, "w")
-
         # Create a dictionary out of the current labware 
         labware_dictionary = self.labware_to_dictionary()
 
-        # Dump the labware dictionary into the json file
-        json.dump(labware_dictionary, output_file)
+        # Dump the labware dictionary into the json file (orjson is used when available since it's faster, numpy values come from the calibration)
+        if orjson is not None:
+            with open(file_path, "wb") as output_file:
+                output_file.write(orjson.dumps(labware_dictionary, option=orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(file_path, "w") as output_file:
+                json.dump(labware_dictionary, output_file)
 
     def load_labware_from_file(self, file_name):
         # Path
         folder_path = self.get_path_to_saved_labware_folder()
         file_path = os.path.join(folder_path, file_name) # Add the name of the file of interest to that path string
-        # Open an existing json file
-        input_file = open(file_path, "r")
-
-        # Create a dictionary out of the data in the specified json file
-        labware_dictionary = json.load(input_file)
+        # Open an existing json file and create a dictionary out of its data
+        with open(file_path, "rb") as input_file:
+            labware_data = input_file.read()
+        labware_dictionary = orjson.loads(labware_data) if orjson is not None else json.loads(labware_data)
 
         # Create labware out of the dictionary
         self.dictionary_to_labware(labware_dictionary)
@@ -233,6 +265,6 @@ class Labware_class:
                 plate_number += 1
         
     def available_saved_labware_files(self):
-        path = os.listdir(self.get_path_to_saved_labware_folder())
+        path = list_files(self.get_path_to_saved_labware_folder())
         return path
 
@@ -5,53 +5,38 @@ MODELS MANAGER CLASS
 """
 import os
 import json
+import copy
+from directory_cache import list_files
 
 LABWARE_CHIP = "c"
 LABWARE_PLATE = "p"
 LABWARE_SYRINGE = "s"
 
-RELATIVE_PATH_TO_CHIPS_W = "\\models\\chips"
-RELATIVE_PATH_TO_PLATES_W = "\\models\\plates"
-RELATIVE_PATH_TO_SYRINGES_W = "\\models\\syringes"
-
-RELATIVE_PATH_TO_CHIPS_R = "/models/chips"
-RELATIVE_PATH_TO_PLATES_R = "/models/plates"
-RELATIVE_PATH_TO_SYRINGES_R = "/models/syringes"
+MODELS_FOLDERS = { # Folder (inside of the models folder) with the model files of each component type
+    LABWARE_CHIP: "chips",
+    LABWARE_PLATE: "plates",
+    LABWARE_SYRINGE: "syringes",
+}
 
 class ModelsManager:
     def __init__(self, operating_system):
-        self.operating_system = operating_system # Either "w" or "r" for windows and raspberry os
+        self.operating_system = operating_system # Either "w" or "r" for windows and raspberry os. The paths don't depend on it, os.path.join handles the separators
         self.models = dict() # Disctionary with 2 keys: "chips" and "plates", each of which has a list of models
+        self.parameters_cache = dict() # Parameters of the models already read from their files: (component_type, component_model) -> (modification time, parameters)
     
-    # This returns a path to the folder that contains the model files of the specified component type
+    # This returns a path to the folder that contains the model files of the specified component type. os.path.join gives the right separator on every OS
     def get_path(self, component_type):
         current_path = os.getcwd() # returns the current directory (where this file is stored) ---------> MIGHT BE PROBLEMATIC if this class is imported and run on a different path, will this return the path of the file that called this module or will it return the path of this file?
-        relative_path = "" # relative path with respect to the path where this file is contained
-        if (component_type == LABWARE_CHIP):
-            if (self.operating_system == "w"):
-                relative_path = RELATIVE_PATH_TO_CHIPS_W
-            elif (self.operating_system == "r"):
-                relative_path = RELATIVE_PATH_TO_CHIPS_R
-
-        elif (component_type == LABWARE_PLATE):
-            if (self.operating_system == "w"):
-                relative_path = RELATIVE_PATH_TO_PLATES_W
-            elif (self.operating_system == "r"):
-                relative_path = RELATIVE_PATH_TO_PLATES_R
-
-        elif (component_type == LABWARE_SYRINGE):
-            if (self.operating_system == "w"):
-                relative_path = RELATIVE_PATH_TO_SYRINGES_W
-            elif (self.operating_system == "r"):
-                relative_path = RELATIVE_PATH_TO_SYRINGES_R
-        path_of_interest = current_path + relative_path
-        return path_of_interest
+        folder = MODELS_FOLDERS.get(component_type)
+        if folder is None:
+            return current_path
+        return os.path.join(current_path, "models", folder)
 
     # Returns the list of models for chips
     def get_component_models(self, component_type):
         component_models = list() # Create an empty list to store the names of each file
         path_of_interest = self.get_path(component_type) # This command gets the path to the chips folder
-        component_models = [f.split(".")[0] for f in os.listdir(path_of_interest) if os.path.isfile(os.path.join(path_of_interest, f))] # This returns a list of all the files in the path_of_interest
+        component_models = [f.split(".")[0] for f in list_files(path_of_interest)] # This returns a list of all the files in the path_of_interest
             
         return component_models
 
@@ -64,31 +49,43 @@ class ModelsManager:
 
     # This returns the parameters (contents of a file) of the specified model as a dictionary
         # Arguments: "c" (for chip), "p" (for plate), "s" (for syringe)
+        # The file is only read again when its modification time changes, otherwise the parameters come from self.parameters_cache
+        # Callers get a copy, so modifying the returned dictionary doesn't change the cached parameters
     def get_model_parameters(self, component_type, component_model):
-        path_to_models_folder = self.get_path(component_type)
-        file_path = ""
-
-        if (self.operating_system == "w"):
-            file_path = open(path_to_models_folder + "\\" + component_model + ".json")
+        file_path = self.get_model_file_path(component_type, component_model)
 
-        elif (self.operating_system == "r"):
-            file_path = open(path_to_models_folder + "/" + component_model + ".json")
+        cache_key = (component_type, component_model)
+        modification_time = os.stat(file_path).st_mtime_ns
+        cached = self.parameters_cache.get(cache_key)
+        if cached is not None and cached[0] == modification_time:
+            return copy.deepcopy(cached[1])
         
-        parameters = json.load(file_path)
+        with open(file_path) as model_file:
+            parameters = json.load(model_file)
+
+        self.parameters_cache[cache_key] = (modification_time, parameters)
+        return copy.deepcopy(parameters)
+
+    # This returns the path of the file of the specified model
+    def get_model_file_path(self, component_type, component_model):
+        return os.path.join(self.get_path(component_type), component_model + ".json")
 
-        return parameters
+    # This returns the modification time of the file of the specified model, so that values computed from its parameters can be cached too
+    def get_model_modification_time(self, component_type, component_model):
+        return os.stat(self.get_model_file_path(component_type, component_model)).st_mtime_ns
+
+    # This forgets the cached parameters of a model (or of every model if none is specified) so that they get read again from the file
+    def clear_parameters_cache(self, component_type = None, component_model = None):
+        if component_type is None:
+            self.parameters_cache.clear()
+        else:
+            self.parameters_cache.pop((component_type, component_model), None)
 
     def save_new_model_file(self, component_type, new_model_name, properties):
         path_to_type = self.get_path(component_type)
-        output_file = ""
-
-        if (self.operating_system == "w"):
-            output_file = open(path_to_type + "\\" + new_model_name + ".json", "w")
-        
-        elif (self.operating_system == "r"):
-            output_file = open(path_to_type + "/" + new_model_name + ".json", "w")
-        
-        json.dump(properties, output_file)
+        with open(os.path.join(path_to_type, new_model_name + ".json"), "w") as output_file:
+            json.dump(properties, output_file)
+        self.clear_parameters_cache(component_type, new_model_name) # The file might be overwriting a model that was already cached
 
     def create_chip_model(self, new_model_name, grid, point_distance, well_distance, row_types, nicknames):
         properties = { 
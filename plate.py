@@ -23,15 +23,18 @@ class Plate:
         else:
             self.import_plate_properties(plate_properties)
             self.void_depth: bool = False 
+        self.protocol_positions = None # Location used by protocols for every nickname, built on first use and cleared whenever a location or depth changes
 
     # Stores the location of a specified pot
     def set_location(self, pot_index, location_tuple):
         self.pot_locations[pot_index] = location_tuple
+        self.protocol_positions = None
     
     # Stores the nickname of a specified pot
     def set_nickname(self, pot_index, nickname):
         self.nicknames[pot_index] = nickname
         self.nicknames_inv[nickname] = pot_index
+        self.protocol_positions = None
 
     # Gets the nickname stored for the specified pot
     def get_nickname(self, pot_index):
@@ -44,9 +47,11 @@ class Plate:
     # Stores the depth of the speficied pot
     def set_pot_depth(self, pot_index, pot_depth):
         self.pot_depths[pot_index] = pot_depth
+        self.protocol_positions = None
 
     def void_plate_depth(self, void: bool = False):
         self.void_depth = void
+        self.protocol_positions = None
         # print(f"Voiding depth for {self.get_model_name()}, self.void_depth = {self.void_depth}")
 
 
@@ -62,19 +67,26 @@ class Plate:
     def get_location_by_nickname(self, pot_nickname):
         return self.pot_locations[self.nicknames_inv[pot_nickname]]
 
+    # Returns the location a protocol goes to for a given pot specified by its nickname (the bottom of the pot unless the depth is voided)
     def pot_position_for_protocol(self, pot_nickname):
-        location = self.pot_locations[self.nicknames_inv[pot_nickname]]
-        x = location[0]
-        y = location[1]
-        z = location[2]
-        depth = self.get_pot_depth(0)
-        location_with_depth = [x, y, z - depth]
-        if self.void_depth:
-            # print("Depth has been voided. Returning calibration point level.")
-            return location
-        else:
-            # print(f"Depth for {self.get_model_name()} has not been voided. Going to the bottom of plate. ")
-            return location_with_depth
+        return self.pot_positions_for_protocol()[pot_nickname]
+
+    # Returns a dictionary with the protocol location of every pot by its nickname. Protocols look up the same pots over and over, so
+    # the locations are computed once and kept until a location, the depth, or the voiding of the depth changes
+    def pot_positions_for_protocol(self):
+        if self.protocol_positions is None:
+            depth = self.get_pot_depth(0)
+            positions = dict()
+            for nickname, pot_index in self.nicknames_inv.items():
+                location = self.pot_locations[pot_index]
+                if self.void_depth:
+                    # Depth has been voided. Returning calibration point level.
+                    positions[nickname] = location
+                else:
+                    # Depth has not been voided. Going to the bottom of plate.
+                    positions[nickname] = [location[0], location[1], location[2] - depth]
+            self.protocol_positions = positions
+        return self.protocol_positions
 
     # Returns the location of a given pot specified by its index
     def get_location_by_index(self, pot_index):
@@ -124,4 +136,5 @@ class Plate:
         self.nicknames_inv = dict()
         for index in range(len(self.nicknames)):
             self.nicknames_inv[self.nicknames[index]] = index
+        self.protocol_positions = None
 
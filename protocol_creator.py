@@ -16,18 +16,12 @@ import csv
 import re
 import datetime
 
-# RELATIVE_PATH_TO_PROTOCOLS_W = ''
-RELATIVE_PATH_TO_PROTOCOLS_W = '\\protocols\\' # ./ means look within the current directory
-RELATIVE_PATH_TO_PROTOCOLS_L = '/protocols/'
-
-RELATIVE_PATH_TO_LABWARE_W = '\\saved_labware\\'
-RELATIVE_PATH_TO_LABWARE_L = '/saved_labware/'
+PROTOCOLS_DIR = Path(sys.path[0], 'protocols') # Folders next to the script that started the app. Path uses the right separator on every OS
+LABWARE_DIR = Path(sys.path[0], 'saved_labware')
 
 START_OF_PROTOCOL_TEXT = "# ------------START OF PROTOCOL---------------------------------\n"
 
 
-LINUX_OS = 'posix'
-WINDOWS_OS = 'nt'
 
 # Texxt for the commands 
 SET_WASHING_POSITIONS_CMD = 'set_washing_positions'
@@ -86,13 +80,7 @@ class ProtocolCreator:
         Returns:
             path_to_file str: returns a string that contains the path
         """        
-        path = sys.path
-        if os.name == LINUX_OS:
-            relative_path = path[0] + RELATIVE_PATH_TO_PROTOCOLS_L
-        elif os.name == WINDOWS_OS:
-            relative_path = path[0] + RELATIVE_PATH_TO_PROTOCOLS_W
-        path_to_file =  relative_path + filename
-        return path_to_file
+        return str(PROTOCOLS_DIR / filename)
 
     def get_path_to_labware(self, filename: str) -> str:
         """This function builds the path to a file tthat is in the labware folder
@@ -104,13 +92,7 @@ class ProtocolCreator:
         Returns:
             str: returns a string that contains the path
         """        
-        path = sys.path
-        if os.name == LINUX_OS:
-            relative_path = path[0] + RELATIVE_PATH_TO_LABWARE_L
-        elif os.name == WINDOWS_OS:
-            relative_path = path[0] + RELATIVE_PATH_TO_LABWARE_W
-        path_to_file =  relative_path + filename
-        return path_to_file
+        return str(LABWARE_DIR / filename)
     
     def create_new_file(self, filename: str):
         """This function creates a new file in the directory
@@ -4,12 +4,11 @@ import sys
 import signal
 import asyncio
 import psutil
+from pathlib import Path
 # from opentrons import api
 # from coordinator import *
 
-# RELATIVE_PATH_TO_PROTOCOLS_W = ''
-RELATIVE_PATH_TO_PROTOCOLS_W = '.\\protocols\\' # ./ means look within the current directory
-RELATIVE_PATH_TO_PROTOCOLS_L = '/protocols/'
+PROTOCOLS_DIR = Path(sys.path[0], 'protocols') # Folder next to the script that started the app. Path uses the right separator on every OS
 LINUX_OS = 'posix'
 WINDOWS_OS = 'nt'
 
@@ -48,11 +47,10 @@ class Py_Execute:
         self.syringe_model = name
 
     def execute_python_protocol(self):
-        if self.set_get_path():
-            first_arg = self.set_get_path()
-        else:
+        first_arg = self.set_get_path()
+        if not first_arg:
             sys.exit()
-        cmd = 'python ' + first_arg 
+        cmd = 'python "' + first_arg + '"' # The path is absolute now, quoted in case a folder in it has spaces
         self.p = subprocess.Popen(cmd, shell=True)
         out, err= self.p.communicate()
         if err == None:
@@ -63,16 +61,14 @@ class Py_Execute:
                 print(out)
 
     def set_get_path(self):
-        path = sys.path
-        if os.name == LINUX_OS:
-            relative_path = path[0] + RELATIVE_PATH_TO_PROTOCOLS_L
-        elif os.name == WINDOWS_OS:
-            relative_path = RELATIVE_PATH_TO_PROTOCOLS_W
         if self.filename == "- Select a Protocol -":
             print("No protocol selected")
             return None
-        else:
-            self.path_to_file =  relative_path + self.filename 
+        path = (PROTOCOLS_DIR / self.filename).resolve()
+        if path.parent != PROTOCOLS_DIR.resolve(): # i.e. "../web_app.py", only the protocols in the folder can be run
+            print(f"WARNING: '{self.filename}' is not a file of the protocols folder")
+            return None
+        self.path_to_file = str(path)
         return self.path_to_file
 
     def pause_execution(self):
@@ -2,6 +2,7 @@ var socket = io.connect('http://127.0.0.1:5000');
 
 var stored_calibration_points;
 var home_button = document.getElementById("back_home");
+var capture_point_button = document.getElementById("capture_point");
 var test_button = document.getElementById("test");
 var good_calibration_button = document.getElementById("good_calibration");
 var bad_calibration_button = document.getElementById("bad_calibration");
@@ -38,11 +39,17 @@ socket.on("feedback_calibration_point", function(new_position) {
 
 socket.on("stored_calibration_points", function(calibration_points) {
     console.log("stored_calibration_points")
+    capture_point_button.disabled = true; // All of the points have been captured
     test_button.disabled = false; // Enable the test button
     console.log(calibration_points)
     stored_calibration_points = calibration_points;
 });
 
+capture_point_button.addEventListener("click", function() {
+    console.log("capture_point_button.addEventListener")
+    socket.emit("capture_calibration_point"); // The current position is stored as the next calibration point
+});
+
 test_button.addEventListener("click", function() {
     console.log("test_button.addEventListener")
     socket.emit("test_calibration", stored_calibration_points);
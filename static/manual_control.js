@@ -110,44 +110,44 @@ function tc_run_job(data) {
 }
 
 function get_block_temp() {
-    socket.emit("get_block_temp")
+    poll_telemetry()
 }
 
 function get_lid_temp() {
-    socket.emit("get_lid_temp")
+    poll_telemetry()
 }
 
 function home_all_motors() {
 	console.log("Home all motors");
-	socket.emit("home_all_motors");
+	home_by_axis("all");
 }
 
 function home_by_axis(axis){
-    socket.emit("hba", axis)
+    socket.emit("home_axis", axis)
 }
 
 function home_X(){
-    socket.emit("home_X")
+    home_by_axis("X")
 }
 
 function home_Y(){
-    socket.emit("home_Y")
+    home_by_axis("Y")
 }
 
 function home_Z(){
-    socket.emit("home_Z")
+    home_by_axis("Z")
 }
 
 function home_A(){
-    socket.emit("home_A")
+    home_by_axis("A")
 }
 
 function home_B(){
-    socket.emit("home_B")
+    home_by_axis("B")
 }
 
 function home_C(){
-    socket.emit("home_C")
+    home_by_axis("C")
 }
 
 function go_to_deck_slot(slot) {
@@ -175,11 +175,11 @@ function deactivate_tempdeck() {
 }
 
 function check_tempdeck_status() {
-    socket.emit("check_tempdeck_status")
+    poll_telemetry()
 }
 
 function get_tempdeck_temp() {
-    socket.emit("get_tempdeck_temp")
+    poll_telemetry()
 }
 
 function take_picture() {
@@ -195,30 +195,22 @@ function toggle_focus() {
     socket.emit("toggle_focus");
 }
 
-let btemp = 0;
-socket.on("get_block_temp", function(temp) {
-    console.log(temp)
-    btemp = temp;  
-    var temp = document.getElementById("blockT")
-    temp.innerHTML = btemp;
-});
+// Asks for the temperatures of the modules and the coordinates, all of them come back in a single telemetry message
+function poll_telemetry() {
+    socket.emit("poll_telemetry")
+}
 
-socket.on("get_tempdeck_temp", function(temp) {
-    console.log(temp)
-    var temp1 = document.getElementById("tdT")
-    temp1.innerHTML = temp;
-});
+// Pairs each field of the telemetry message with the element of the page that displays it
+const TELEMETRY_ELEMENTS = {"block": "blockT", "lid": "lidT", "tempdeck": "tdT", "tempdeck_status": "tdS"};
 
-socket.on("check_tempdeck_status", function(status) {
-    console.log(status)
-    var status1 = document.getElementById("tdS")
-    status1.innerHTML = status;
-});
-
-socket.on("get_lid_temp", function(temp) {
-    console.log(temp)
-    var temp1 = document.getElementById("lidT")
-    temp1.innerHTML = temp;
+socket.on("telemetry", function(telemetry) {
+    console.log(telemetry)
+    for (const field in TELEMETRY_ELEMENTS) {
+        var element = document.getElementById(TELEMETRY_ELEMENTS[field])
+        if (element != null) { // Not every version of the page displays every field
+            element.innerHTML = telemetry[field];
+        }
+    }
 });
 
 //The socket.on event is placed after the testing call for populate_component_models() to make sure the testing happens before actual data is received and processed (otherwise test data would overwrite actual data)
@@ -137,28 +137,26 @@ socket.on('protocol_python_description', function(description) {
     description_text.innerHTML = description
 });  
 
-// listens for the json data
-socket.on('protocol_python_data', function(python_lines_list) {
+// Shows the contents of the protocol file in a text area
+function show_protocol_contents(protocol_text) {
     console.log("protocols received")
-    python_data = python_lines_list; // save list in scripts variable
+    python_data = protocol_text; // save the contents in scripts variable
     var content = document.getElementById("file_contents")
     
     text_area_left = '<textarea id="w3review" name="w3review" rows="4" cols="50">'
     text_area_right = '</textarea>'
-    text = "<br>" + text_area_left
-    for (let i = 0; i < python_data.length; i++) {
-        if (python_data[i][0] == '#') {
-            text +=  python_data[i] ;
-        } else {
-            
-            text += python_data[i] ;
-        }
-    }
-    content.innerHTML = text + text_area_right + "<br>"    
-});  
+    content.innerHTML = "<br>" + text_area_left + protocol_text + text_area_right + "<br>"    
+}
 
+// The file is downloaded as it is from its own route, so the server sends it straight from the disk
 function display_contents() {
-    socket.emit("display_contents")
+    fetch("/protocols/" + encodeURIComponent(protocol_to_display))
+        .then(function(response) {
+            if (!response.ok) { throw new Error("Protocol " + protocol_to_display + " not found"); }
+            return response.text();
+        })
+        .then(show_protocol_contents)
+        .catch(function(error) { console.log(error); });
 }
 
 function display_labware() {
@@ -15,4 +15,21 @@ $(document).ready( function(){
         submit_button.disabled = false;
     };
 
+    // The file is sent as the raw body of the request so that the server can write it to disk as it arrives. Browsers without fetch submit the form as usual
+    $("form").on("submit", function(event) {
+        var file = file_upload.files[0];
+        var command = $("input[name=command]:checked").val();
+        if (!file || !command || !window.fetch) {
+            return;
+        }
+        event.preventDefault();
+        fetch("/upload_new_model?name=" + encodeURIComponent(file.name) + "&command=" + encodeURIComponent(command), {
+            method: "POST",
+            headers: {"Content-Type": "application/octet-stream"},
+            body: file
+        }).then(function() {
+            window.location.reload(); // Shows the message left by the server
+        });
+    });
+
   })
\ No newline at end of file
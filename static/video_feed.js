@@ -0,0 +1,26 @@
+// Switches the video feeds of the page from the multipart routes to frames pushed through the socket.
+// Each image of a feed has a data-camera attribute with the number of its camera. The image keeps its multipart source until the first
+// frame arrives, so pages still show video (or the "camera not working" image) if the server doesn't send frames through the socket
+(function() {
+    var video_socket = io.connect('http://127.0.0.1:5000');
+    var feeds = document.querySelectorAll("img[data-camera]");
+
+    Array.prototype.forEach.call(feeds, function(feed) {
+        var camera = Number(feed.getAttribute("data-camera"));
+        var frame_url = null;
+
+        video_socket.on("camera_" + camera + "_frame", function(jpeg, frame_displayed) {
+            var new_url = URL.createObjectURL(new Blob([jpeg], {type: "image/jpeg"}));
+            feed.onload = feed.onerror = function() {
+                if (frame_url != null && frame_url != new_url) {
+                    URL.revokeObjectURL(frame_url); // The previous frame is not shown anymore
+                }
+                frame_url = new_url;
+                frame_displayed(); // Tells the server to send the next frame
+            };
+            feed.src = new_url;
+        });
+
+        video_socket.emit("start_video_feed", camera);
+    });
+})();
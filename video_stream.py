@@ -1,18 +1,37 @@
 """
 VIDEOSTREAM CLASS
     This class allows for extracting frames from a hardware camera connected to the hardware running the script
+BROADCASTCAMERA CLASS
+    This class encodes the frames of a VideoStream once and shares them with every client watching the video feed
 """
 
 import cv2
-from threading import Thread
+import time
+from threading import Thread, Condition, Lock
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420
+    turbo_jpeg = TurboJPEG() # Raises OSError if the libjpeg-turbo library itself is not installed
+except (ImportError, OSError):
+    turbo_jpeg = None
+
+CAPTURE_FOURCC = 'MJPG' # Pixel format requested to the camera. USB webcams compress MJPG frames themselves, raw formats saturate the USB link at higher resolutions
 
 class VideoStream:
     def __init__(self, src = 0):
-        self.stream = cv2.VideoCapture(src) # Initialize the stream from camera object in index 0
-        (self.grabbed, self.frame) = self.stream.read() # Extract frame
+        self.src = src
+        self.stream = None # The camera is only opened when the stream is started, so creating the object doesn't wait for the device
+        (self.grabbed, self.frame) = (False, None)
         self.stopped = False
+
+    def open(self):
+        if self.stream is None:
+            self.stream = cv2.VideoCapture(self.src) # Initialize the stream from camera object in index src
+            self.stream.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*CAPTURE_FOURCC)) # Ignored by cameras that don't support it
+            (self.grabbed, self.frame) = self.stream.read() # Extract frame
+        return self
     
     def start(self):
+        self.open()
         self.stopped = False
         t = Thread(target=self.update)
         t.start()
@@ -28,3 +47,81 @@ class VideoStream:
     def stop(self):
         self.stopped = True
 
+
+JPEG_QUALITY = 80 # 0 to 100. OpenCV's default (95) makes frames about twice as big without a visible difference in the video feed
+JPEG_ENCODE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
+MJPEG_PART_PREFIX = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' # Boundary and headers of every part of a multipart/x-mixed-replace response
+MJPEG_PART_SUFFIX = b'\r\n\r\n'
+
+FRAME_POLL_INTERVAL = 0.005 # SECONDS. Time the broadcaster waits before checking again when the camera hasn't delivered a new frame
+CLIENT_FRAME_TIMEOUT = 1 # SECONDS. Longest time a client waits for a new frame before checking if the camera was stopped
+
+class BroadcastCamera:
+    """
+    Reads the frames of a VideoStream on a single background thread, processes and encodes each new frame to JPEG once, and shares 
+    the result with every client of the video feed. Clients that are slower than the camera skip frames instead of falling behind
+    """
+    def __init__(self, stream, process_frame = None):
+        self.stream = stream
+        self.process_frame = process_frame # Function that receives a frame and returns the image to be sent (i.e. flipped and resized)
+        self.frame_bytes = None # Last encoded frame
+        self.frame_id = 0 # Increases every time a new frame is encoded
+        self.new_frame = Condition()
+        self._thread = None
+        self._thread_lock = Lock()
+
+    def start(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self.stream.start()
+                self._thread = Thread(target=self.update, daemon=True, name='Camera broadcaster')
+                self._thread.start()
+        return self
+
+    def update(self):
+        last_frame = None
+        while not self.stream.stopped:
+            frame = self.stream.read()
+            if frame is None or frame is last_frame:
+                time.sleep(FRAME_POLL_INTERVAL) # The camera hasn't delivered a new frame yet, don't encode the same one again
+                continue
+            last_frame = frame
+            image = frame if self.process_frame is None else self.process_frame(frame)
+            frame_bytes = encode_jpeg(image)
+            if frame_bytes is None:
+                print("Frame is none")
+                continue
+            if frame_bytes == self.frame_bytes:
+                continue # The view didn't change (i.e. the camera is frozen), clients don't need to receive and decode the same image again
+            with self.new_frame:
+                self.frame_bytes = frame_bytes
+                self.frame_id += 1
+                self.new_frame.notify_all()
+
+    # Generator for a single client. Yields the encoded bytes of every new frame
+    def jpegs(self):
+        last_id = 0
+        while not self.stream.stopped:
+            with self.new_frame:
+                if not self.new_frame.wait_for(lambda: self.frame_id != last_id, timeout=CLIENT_FRAME_TIMEOUT):
+                    continue
+                last_id = self.frame_id
+                frame_bytes = self.frame_bytes
+            yield frame_bytes
+
+    # Generator for a single client. Yields every new frame as a part of a multipart/x-mixed-replace response
+    def frames(self):
+        for frame_bytes in self.jpegs():
+            yield mjpeg_part(frame_bytes)
+
+# Returns the bytes of the image encoded as JPEG, or None if it couldn't be encoded. Uses libjpeg-turbo directly when PyTurboJPEG is installed 
+# (SIMD encoder, and the bytes come out without an intermediate array), and OpenCV otherwise
+def encode_jpeg(image):
+    if turbo_jpeg is not None:
+        return turbo_jpeg.encode(image, quality=JPEG_QUALITY, jpeg_subsample=TJSAMP_420)
+    ret, jpeg = cv2.imencode('.jpg', image, JPEG_ENCODE_PARAMS)
+    return jpeg.tobytes() if ret else None
+
+# Wraps an encoded JPEG as a part of a multipart/x-mixed-replace response
+def mjpeg_part(jpeg_bytes):
+    return b''.join((MJPEG_PART_PREFIX, jpeg_bytes, MJPEG_PART_SUFFIX))
@@ -7,13 +7,17 @@ WEB APP SCRIPT
 """
 import cv2
 import os
+import sys
 import time
+import threading
+from functools import partial
 from flask import request
 from flask import Flask, render_template, url_for, Response, flash, request, redirect, send_from_directory
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, emit
 from werkzeug.utils import secure_filename
-from video_stream import VideoStream
+from video_stream import VideoStream, BroadcastCamera, mjpeg_part, encode_jpeg
 from flag import Flag
+from directory_cache import list_files
 import logging
 from coordinator import *
 from python_execute import Py_Execute
@@ -28,15 +32,11 @@ CAMERA_PORT = 0
 CAMERA_PORT_MACBOOK = 1
 PIPPETE_CAMERA_PORT = 1
 PIPPETE_CAMERA_PORT_MACBOOK = 2
-RELATIVE_PATH_TO_PROTOCOLS_W = '.\\protocols\\'
-RELATIVE_PATH_TO_PROTOCOLS_L = './protocols/'
-RELATIVE_PATH_TO_LABWARE_W = 'saved_labware\\'
-RELATIVE_PATH_TO_LABWARE_L = './saved_labware/'
-RELATIVE_PATH_TO_SYRINGES_W = 'models\\syringes\\'
-RELATIVE_PATH_TO_SYRINGES_L = './models/syringes/'
-RELATIVE_PATH_TO_PICTURES_W = 'pictures\\'
-RELATIVE_PATH_TO_PROTOCOL_PICTURES = 'protocol_pics\\'
-RELATIVE_PATH_TO_MANUAL_CONTROL_PICTURES = 'ManualCtrlPics\\'
+PROTOCOLS_DIR = os.path.join('.', 'protocols') # Folders listed by the protocol and labware pages, os.path.join gives the right separator on every OS
+LABWARE_DIR = os.path.join('.', 'saved_labware')
+SYRINGES_DIR = os.path.join('.', 'models', 'syringes')
+SCRIPTS_DIR = os.path.join('..', 'scripts')
+PICTURES_DIR = os.path.join(sys.path[0], 'pictures') # Pictures are saved in a folder (named after the protocol or the manual control page) inside of this one
 LINUX_OS = 'posix'
 WINDOWS_OS = 'nt'
 MACBOOK_OS = 'Darwin'
@@ -56,6 +56,19 @@ BIG_SQR_LINE_THICKNESS = 2
 SMALL_SQR_X1, SMALL_SQR_Y1 = 285, 240
 SMALL_SQR_X2, SMALL_SQR_Y2 = 305, 260
 SMALL_SQR_LINE_THICKNESS = 1
+IDLE_COORDINATES_INTERVAL = 0.5 # SECONDS. Longest time between coordinate reads while the motors are not moving
+MAX_COORDINATES_BACKOFF_STEPS = 5 # The interval between reads can double this many times while the coordinates don't change
+# The handlers wait on threading primitives and the drivers do blocking serial I/O and run their own threads (camera, joystick, event loop),
+# none of which cooperate with green threads. Pinning the mode keeps Flask-SocketIO from switching to eventlet/gevent just because it's installed
+SOCKETIO_ASYNC_MODE = 'threading'
+# In threading mode the socket messages travel over HTTP long-polling, where Engine.IO gzips every payload above 1 KB. The only payloads that 
+# big are the video frames (already compressed JPEG), so compressing them again just costs CPU on both ends
+SOCKETIO_HTTP_COMPRESSION = False
+UPLOAD_CHUNK_SIZE = 64 * 1024 # BYTES. Size of the pieces in which uploaded model files are copied from the request to the disk
+STREAMED_UPLOAD_MIMETYPE = 'application/octet-stream' # Uploads sent with this type carry the raw file as the body, the name and type go in the query
+NOT_CONNECTED = "Not connected" # Reported instead of a reading for the modules that can't be read
+HOME_ALL_AXES = 'all' # Axis received by home_axis to home every motor
+VIDEO_FRAME_EVENT = 'camera_{}_frame' # Event through which the frames of each camera are pushed to the clients watching it
 
 app = Flask(__name__) # __name__ return the name of the file when called by another function. If called within the file it will return "__main__"
 
@@ -77,7 +90,7 @@ logging.getLogger("engineio").setLevel(logging.ERROR)
 # -----------------------------------
 
 coordinator = Coordinator()
-socketio = SocketIO(app, cors_allowed_origins='*') # the second parameter allows to disable some extra security implemented by newer versions of Flask that create an error if this parameter is not added
+socketio = SocketIO(app, cors_allowed_origins='*', async_mode=SOCKETIO_ASYNC_MODE, http_compression=SOCKETIO_HTTP_COMPRESSION) # the second parameter allows to disable some extra security implemented by newer versions of Flask that create an error if this parameter is not added
 
 executer = Py_Execute()
 if RUNNING_APP_FOR_REAL:
@@ -91,7 +104,7 @@ else:
     myCamera = None
     my_Pippete_Camera = None
 sending_syringe = Flag()
-done_calibration_flag = Flag()
+coordinates_pump_lock = threading.Lock() # Held by the background task that sends the coordinates, so that only one of them runs at a time
 componentToCalibrate = []
 app.config['UPLOAD_CHIP_FOLDER'] = coordinator.get_component_models_location(LABWARE_CHIP) # Establishes path to save uploads of chip models
 app.config['UPLOAD_PLATE_FOLDER'] = coordinator.get_component_models_location(LABWARE_PLATE) # Establishes path to save uploads of plate models
@@ -103,70 +116,138 @@ app.config['MAX_CONTENT_LENGTH'] = 1024*1024 # Limit file limit to 1 MB
     This section defines the different routes of the app
 """
 
+rendered_pages = dict() # Template name -> (HTML, ETag). The pages have no context that changes while the app runs, so each one is rendered only once
+
+# Returns the page built from the given template, rendering it the first time it is requested. The response carries an ETag of the HTML so 
+# that browsers that already have the page get an empty 304 response instead of the whole page again
+def render_page(template_name):
+    page = rendered_pages.get(template_name)
+    if page is None:
+        response = Response(render_template(template_name), mimetype='text/html')
+        response.add_etag()
+        page = (response.get_data(), response.get_etag()[0])
+        rendered_pages[template_name] = page
+    html, etag = page
+    response = Response(html, mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True # Browsers keep the page but check with the server before using it 
+    return response.make_conditional(request)
+
 @app.route('/')
 @app.route('/home')
 def home():
-    return render_template("home_wix.html")
+    return render_page("home_wix.html")
 
 @app.route('/manual_control')
 def manual_control():
-    return render_template("manual_control_wix.html")
+    return render_page("manual_control_wix.html")
 
 @app.route('/calibrate_component')
 def calibrate_component():
     # print("calibrate_component")
-    return render_template("calibration.html")
+    return render_page("calibration.html")
 
 @app.route('/load_calibration')
 def load_component_calibration():
-    return render_template("load_calibration.html")
+    return render_page("load_calibration.html")
 
 @app.route('/labware')
 def labware():
-    return render_template("labware.html")
+    return render_page("labware.html")
 
 @app.route('/labware/add')
 def add_labware():
-    return render_template("add_labware.html")
+    return render_page("add_labware.html")
 
 @app.route('/labware/create_model')
 def create_labware_model():
-    return render_template("labware_creation.html")
+    return render_page("labware_creation.html")
 
 @app.route('/save_labware_setup')
 def save_labware_setup():
-    return render_template("save_labware_setup.html")
+    return render_page("save_labware_setup.html")
 
 @app.route('/load_labware_setup')
 def load_labware_setup():
-    return render_template("load_labware_setup.html")
+    return render_page("load_labware_setup.html")
 
 @app.route('/protocol')
 def script():
-    return render_template("script.html")
+    return render_page("script.html")
 
 @app.route('/protocol_edition')
 def batch_page():
-    return render_template("protocol_edition_wix.html")
+    return render_page("protocol_edition_wix.html")
 
 @app.route('/settings')
 def system_settings():
-    return render_template("settings.html")
+    return render_page("settings.html")
 
 @app.route("/", methods =["POST"])
 def PostData():
     data = request.get_json(force=True)
     coordinator.set_picture_flag(bool(data['take_pic']))
     coordinator.set_folder_for_pictures(data['protocol_folder'])
+    return ('', 204) # Nothing to send back, the picture is written by the video feed
     
+# Returns the path of the file with the given name inside of the folder, or None if the name points outside of it (i.e. "../constants.py")
+def path_inside_folder(folder, file_name):
+    folder = os.path.realpath(folder)
+    path = os.path.realpath(os.path.join(folder, file_name))
+    if os.path.dirname(path) != folder:
+        return None
+    return path
+
 # This method checks to see if the filename ends with an allowed extension
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# This returns the folder where the models of the given labware component type are saved (None for unknown types)
+def upload_folder_for(component_type):
+    if (component_type == LABWARE_CHIP):
+        return app.config['UPLOAD_CHIP_FOLDER']
+    elif (component_type == LABWARE_PLATE):
+        return app.config['UPLOAD_PLATE_FOLDER']
+    elif (component_type == LABWARE_SYRINGE):
+        return app.config['UPLOAD_SYRINGE_FOLDER']
+    return None
+
+# This copies a model file sent as the raw body of the request straight to the disk, one chunk at a time, without parsing a multipart form
+def save_streamed_model():
+    filename = request.args.get('name', '')
+    folder = upload_folder_for(request.args.get('command'))
+    if filename == '' or folder is None:
+        flash('No selected file')
+        return ('', 400)
+    if not allowed_file(filename):
+        flash(f"Wrong type of file uploaded. Only {ALLOWED_EXTENSIONS} files allowed")
+        return ('', 400)
+    if request.content_length is not None and request.content_length > app.config['MAX_CONTENT_LENGTH']:
+        return ('', 413)
+    filename = secure_filename(filename)
+    path = os.path.join(folder, filename)
+    written = 0
+    with open(path, 'wb') as document:
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > app.config['MAX_CONTENT_LENGTH']:
+                break
+            document.write(chunk)
+    if written > app.config['MAX_CONTENT_LENGTH']:
+        os.remove(path) # Don't leave half of a model behind
+        return ('', 413)
+    flash(f"'{filename}' succesfully uploaded")
+    return ('', 204)
+
 @app.route('/upload_new_model', methods=["GET", "POST"])
 def upload_new_model():
     # The route can be accessed with either a GET request or a POST request (if it's just a GET, it will only return the basic template)
+    if request.method == "POST" and request.mimetype == STREAMED_UPLOAD_MIMETYPE:
+        return save_streamed_model()
     if request.method == "POST":
         if request.files: # If there is a files object sent along with the request
             document = request.files["modelFile"] # Select the file from the files dictionary
@@ -177,13 +258,9 @@ def upload_new_model():
             # This will check for presence of a file again and for the appropriate extension
             if allowed_file(document.filename):
                 filename = secure_filename(document.filename)
-                component_type = request.form.get('command')
-                if (component_type == LABWARE_CHIP):
-                    document.save(os.path.join(app.config['UPLOAD_CHIP_FOLDER'], filename)) # This saves the document to the specified path in UPLOAD_FOLDER
-                elif (component_type == LABWARE_PLATE):
-                    document.save(os.path.join(app.config['UPLOAD_PLATE_FOLDER'], filename)) # This saves the document to the specified path in UPLOAD_FOLDER
-                elif (component_type == LABWARE_SYRINGE):
-                    document.save(os.path.join(app.config['UPLOAD_SYRINGE_FOLDER'], filename)) # This saves the document to the specified path in UPLOAD_FOLDER
+                folder = upload_folder_for(request.form.get('command'))
+                if folder is not None:
+                    document.save(os.path.join(folder, filename)) # This saves the document to the specified path in UPLOAD_FOLDER
                 
                 flash(f"'{filename}' succesfully uploaded")
                 return redirect(request.url) #(url_for('upload_new_model', filename=filename))
@@ -192,69 +269,57 @@ def upload_new_model():
                 return redirect(request.url)                
     return render_template("upload_new_model.html")
 
-def gen_1(camera: VideoStream):
-    while True:
-        if camera.stopped:
-            break
-        frame = camera.read()
-        cam = cv2.flip(frame, -1)#its flipped because the camera veiwing all of OT2 is upside down
-        scale_percent = 65 # percent of original size
-        width = int(frame.shape[1] * scale_percent / 100)
-        height = int(frame.shape[0] * scale_percent / 100)
-        dim = (width, height)
-        resized = cv2.resize(cam, dim)
-        # font = cv2.FONT_HERSHEY_SIMPLEX
-        # cv2.putText(frame, "hola amiguitos", (20, 100), font, 1, (255, 255, 255), 2, cv2.LINE_4)
-        ret, jpeg = cv2.imencode('.jpg', resized)
-        if jpeg is not None: #jpeg is not None:
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n\r\n')
-        else:
-            print("Frame is none")
-
-def gen_2(camera):
-    img_counter = 0
-    while RUNNING_APP_FOR_REAL:
-        if camera.stopped:
-            break
-        frame = camera.read()
-        img_with_rect = frame.copy()
-
+# Sends the contents of a protocol file as they are. send_from_directory refuses names that point outside of the folder and lets the server 
+# copy the file straight from the disk to the socket (and answer with 304 if the browser already has that version)
+@app.route('/protocols/<protocol_name>')
+def protocol_file(protocol_name):
+    return send_from_directory(PROTOCOLS_DIR, protocol_name, mimetype='text/plain', conditional=True)
+
+# Prepares the frames of the camera viewing all of the OT2 before they are encoded
+def process_frame_1(frame):
+    scale_percent = 65 # percent of original size
+    width = int(frame.shape[1] * scale_percent / 100)
+    height = int(frame.shape[0] * scale_percent / 100)
+    dim = (width, height)
+    # font = cv2.FONT_HERSHEY_SIMPLEX
+    # cv2.putText(frame, "hola amiguitos", (20, 100), font, 1, (255, 255, 255), 2, cv2.LINE_4)
+    resized = cv2.resize(frame, dim)
+    return cv2.flip(resized, -1, resized) # its flipped because the camera veiwing all of OT2 is upside down. Flipped in place after resizing so that no full size copy is made
+
+# Prepares the frames of the pipette camera before they are encoded, and writes the picture requested by a protocol if there is one
+def process_frame_2(frame):
+    scale_percent = 65 # percent of original size
+    width = int(frame.shape[1] * scale_percent / 100)
+    height = int(frame.shape[0] * scale_percent / 100)
+    dim = (width, height)
+    if coordinator.get_toggle_flag() == True:
+        img_with_rect = frame.copy() # The camera's frame is shared with the other readers of the stream, so the squares are drawn on a copy
         cv2.rectangle(img_with_rect, (BIG_SQR_X1, BIG_SQR_Y1), (BIG_SQR_X2, BIG_SQR_Y2), WHITE, BIG_SQR_LINE_THICKNESS)
         cv2.rectangle(img_with_rect, (SMALL_SQR_X1, SMALL_SQR_Y1), (SMALL_SQR_X2, SMALL_SQR_Y2), WHITE, SMALL_SQR_LINE_THICKNESS)
-        
-        scale_percent = 65 # percent of original size
-        width = int(frame.shape[1] * scale_percent / 100)
-        height = int(frame.shape[0] * scale_percent / 100)
-        dim = (width, height)
-        if coordinator.get_toggle_flag() == True:
-            resized = cv2.resize(img_with_rect, dim)
-        else:
-            resized = cv2.resize(frame, dim)
-        flipped = cv2.rotate(resized, cv2.cv2.ROTATE_90_CLOCKWISE)
-        flipped2 = cv2.rotate(flipped, cv2.cv2.ROTATE_90_CLOCKWISE)
-        ret, jpeg = cv2.imencode('.jpg', flipped2)
-        if jpeg is not None:
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n\r\n')
-        else:
-            print("Frame is none")
-        if coordinator.get_picture_flag() == True:
-            folder = coordinator.get_folder_for_pictures()
-            if folder:
-                directory = sys.path[0] + "\\"+ RELATIVE_PATH_TO_PICTURES_W + folder + '\\'
-            else:
-                directory = sys.path[0] + "\\"+ RELATIVE_PATH_TO_PICTURES_W
-            print(f"Writing picture to: \nDirectory:       '{directory}'")
-            current_time =  datetime.datetime.now()
-            protocol_name = executer.get_file_name().strip(".py")
-            img_name = f"{protocol_name}_{current_time.month}-{current_time.day}-{current_time.year} at {current_time.hour}.{current_time.minute}.{current_time.second}.jpg"
-            print(f"Name of picture:         '{img_name}'")
-            cv2.imwrite(directory + img_name, flipped2)
-            print(f"{img_name} written!")
-            img_counter += 1
-            coordinator.set_picture_flag(False)       
-
+        resized = cv2.resize(img_with_rect, dim)
+    else:
+        resized = cv2.resize(frame, dim)
+    flipped2 = cv2.flip(resized, -1, resized) # Rotated 180 degrees in place. Same as two 90 degree rotations without the two extra copies
+    if coordinator.get_picture_flag() == True:
+        folder = coordinator.get_folder_for_pictures()
+        directory = os.path.join(PICTURES_DIR, folder) if folder else PICTURES_DIR
+        print(f"Writing picture to: \nDirectory:       '{directory}'")
+        current_time =  datetime.datetime.now()
+        protocol_name = executer.get_file_name().strip(".py")
+        img_name = f"{protocol_name}_{current_time.month}-{current_time.day}-{current_time.year} at {current_time.hour}.{current_time.minute}.{current_time.second}.jpg"
+        print(f"Name of picture:         '{img_name}'")
+        cv2.imwrite(os.path.join(directory, img_name), flipped2)
+        print(f"{img_name} written!")
+        coordinator.set_picture_flag(False)
+    return flipped2
+
+# One broadcaster per camera: every frame is processed and encoded once no matter how many clients are watching the feed
+camera_1_broadcast = BroadcastCamera(myCamera, process_frame_1) if myCamera != None else None
+camera_2_broadcast = BroadcastCamera(my_Pippete_Camera, process_frame_2) if my_Pippete_Camera != None else None
+camera_broadcasts = {1: camera_1_broadcast, 2: camera_2_broadcast}
+video_feed_clients = {camera: dict() for camera in camera_broadcasts} # Camera -> {sid of a client watching it: True once it displayed the last frame sent}
+video_feed_lock = threading.Lock() # Protects video_feed_clients, which is modified by the socket handlers and read by the frame tasks
+video_pump_locks = {camera: threading.Lock() for camera in camera_broadcasts} # Held by the background task that sends the frames of each camera
 
 def cam_not_working():
     while True:
@@ -266,14 +331,12 @@ def cam_not_working():
         
         # resize image
         frame = cv2.resize(frame, dim, interpolation = cv2.INTER_AREA)
-        ret, jpeg = cv2.imencode('.jpg', frame)
-        yield (b'--frame\r\n'
-                b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n\r\n') 
+        yield mjpeg_part(encode_jpeg(frame))
 
 @app.route('/video_1_feed')
 def video_1_feed():
-    if myCamera != None:
-        return Response(gen_1(myCamera.start()),
+    if camera_1_broadcast != None:
+        return Response(camera_1_broadcast.start().frames(),
                         mimetype='multipart/x-mixed-replace; boundary=frame')
     else:
         return Response(cam_not_working(),
@@ -281,8 +344,8 @@ def video_1_feed():
 
 @app.route('/video_2_feed')
 def video_2_feed():
-    if my_Pippete_Camera != None:
-        return Response(gen_2(my_Pippete_Camera.start()),
+    if camera_2_broadcast != None:
+        return Response(camera_2_broadcast.start().frames(),
                         mimetype='multipart/x-mixed-replace; boundary=frame')
     else:
         return Response(cam_not_working(),
@@ -301,14 +364,15 @@ def stop_sending_coordinates():
 def still_sending():
     return sending_syringe.read()
 
-def read_done_calibration_flag():
-    return done_calibration_flag.read()
-
-def activate_done_calibration_flag():
-    done_calibration_flag.activate()
+# The coordinates are read at the configured refresh rate while they change. Every read that doesn't change them doubles the interval (up to IDLE_COORDINATES_INTERVAL)
+def coordinates_interval(stable_reads):
+    refresh_rate = coordinator.get_coordinate_refresh_rate()
+    backoff_interval = refresh_rate * (1 << min(stable_reads, MAX_COORDINATES_BACKOFF_STEPS))
+    return min(backoff_interval, max(IDLE_COORDINATES_INTERVAL, refresh_rate))
 
-def deactivate_done_calibration_flag():
-    done_calibration_flag.deactivate()
+# Waits until the sending of coordinates is stopped or the timeout runs out, so that stopping doesn't have to wait for the full refresh period
+def wait_while_sending(timeout):
+    sending_syringe.wait_for(False, timeout)
 
 """
 ------------------------------------------------ SOCKET EVENTS
@@ -317,20 +381,98 @@ def deactivate_done_calibration_flag():
 #----------------------------------------------- COORDINATES EVENTS SECTION
 @socketio.on("give_me_coordinates")
 def deliver_coordinates():
-    msg = ""
-    prev = 0
     start_sending_coordinates()
+    emit("new_coordinates", [text_coordinates()]) # The background task only sends changes, the client that just asked gets the current ones
+    socketio.start_background_task(pump_coordinates) # The handler returns right away, the coordinates are sent from the background task
+
+# Runs the coordinates loop unless another task is already running it. A task that finishes checks the flag once more after letting go of 
+# the lock, in case the coordinates were requested again while it was finishing
+def pump_coordinates():
+    while coordinates_pump_lock.acquire(blocking=False):
+        try:
+            send_coordinates_while_requested()
+        finally:
+            coordinates_pump_lock.release()
+        if not still_sending():
+            return
+
+# Emits the coordinates every time they change until stop_coordinates is received
+def send_coordinates_while_requested():
+    last_sent = None
+    stable_reads = 0 # Consecutive reads in which the coordinates didn't change
     while still_sending():
-        if (prev != msg):
-            socketio.emit("new_coordinates", [msg])
-            prev = msg
         msg = text_coordinates()
-        time.sleep(coordinator.get_coordinate_refresh_rate())
+        if msg != last_sent:
+            socketio.emit("new_coordinates", [msg])
+            last_sent = msg
+            stable_reads = 0
+        else:
+            stable_reads += 1
+        wait_while_sending(coordinates_interval(stable_reads))
 
 @socketio.on("stop_coordinates")
 def stop_deliver_coordinates():
     stop_sending_coordinates()
 
+#----------------------------------------------- VIDEO FEED EVENTS SECTION
+# The pages ask for the frames of a camera through the socket and display them as they arrive. Unlike the multipart routes, the browser
+# doesn't buffer them, so the video shows up with at most a frame of delay
+@socketio.on("start_video_feed")
+def start_video_feed(camera):
+    if camera_broadcasts.get(camera) is None:
+        return # Nothing to send, the page keeps showing the multipart feed
+    with video_feed_lock:
+        video_feed_clients[camera][request.sid] = True
+    socketio.start_background_task(pump_video_frames, camera)
+
+@socketio.on("stop_video_feed")
+def stop_video_feed(camera):
+    with video_feed_lock:
+        video_feed_clients.get(camera, {}).pop(request.sid, None)
+
+@socketio.on("disconnect")
+def forget_video_feed_client():
+    with video_feed_lock:
+        for clients in video_feed_clients.values():
+            clients.pop(request.sid, None)
+
+def has_video_feed_clients(camera):
+    with video_feed_lock:
+        return bool(video_feed_clients[camera])
+
+# Runs the frames loop of a camera unless another task is already running it. Same hand over as pump_coordinates
+def pump_video_frames(camera):
+    pump_lock = video_pump_locks[camera]
+    while pump_lock.acquire(blocking=False):
+        try:
+            send_video_frames_while_watched(camera)
+        finally:
+            pump_lock.release()
+        if not has_video_feed_clients(camera):
+            return
+
+# Pushes every new frame of the camera to the clients watching it. A client that hasn't acknowledged the previous frame skips the new
+# one, so slow clients drop frames instead of piling them up in the socket
+def send_video_frames_while_watched(camera):
+    event = VIDEO_FRAME_EVENT.format(camera)
+    for frame_bytes in camera_broadcasts[camera].start().jpegs():
+        with video_feed_lock:
+            clients = video_feed_clients[camera]
+            if not clients:
+                return
+            ready = [sid for sid, displayed in clients.items() if displayed]
+            for sid in ready:
+                clients[sid] = False
+        for sid in ready:
+            socketio.emit(event, frame_bytes, room=sid, callback=partial(mark_frame_displayed, camera, sid)) # bytes are sent as a binary frame
+
+# Acknowledgement callback of a frame: the client is ready for the next one
+def mark_frame_displayed(camera, sid, *args):
+    with video_feed_lock:
+        clients = video_feed_clients[camera]
+        if sid in clients:
+            clients[sid] = True
+
 #----------------------------------------------- MANUAL CONTROL PAGE EVENTS SECTION
 @socketio.on("start_manual_control_window")
 def start_manual_control_window():
@@ -412,23 +554,6 @@ def set_lid_temperature(temp):
     # print(f"set lid temp {temp}")
     coordinator.set_lid_temp(temp)
 
-@socketio.on("get_lid_temp")
-def get_lid_temp():
-    try:
-        temp = coordinator.tc_control.get_lid_temp()
-        socketio.emit("get_lid_temp", temp)
-    except AttributeError:
-        socketio.emit("get_lid_temp", "Not connected")
-
-    
-@socketio.on("get_block_temp")
-def get_block_temp():
-    try:
-        temp = coordinator.tc_control.get_block_temp()
-        socketio.emit("get_block_temp", temp)
-    except AttributeError:
-        socketio.emit("get_block_temp", "Not connected")
-    
 @socketio.on("lid_position")
 def lid_position():
     # print("lid_position")
@@ -471,24 +596,24 @@ def deactivate_tempdeck():
     # print("deactivate_tempdeck")
     coordinator.deactivate_tempdeck()
 
-@socketio.on("get_tempdeck_temp")
-def get_tempdeck_temp():
-    # print("get_tempdeck_temp")
-    if RUNNING_APP_FOR_REAL:
-        temp = coordinator.get_tempdeck_temp()
-        socketio.emit("get_tempdeck_temp", temp)
-    else:
-        socketio.emit("get_tempdeck_temp", "Not connected")
-
-@socketio.on("check_tempdeck_status")
-def check_tempdeck_status():
-    # print("check_tempdeck_status")
+#----------------------------------------------- TELEMETRY EVENTS SECTION
+# Everything the page shows about the state of the system goes in a single message. The thermocycler is asked for its temperatures once for both
+# the lid and the block, and modules that can't be read are reported as "Not connected"
+@socketio.on("poll_telemetry")
+def poll_telemetry():
+    telemetry = {"coordinates": text_coordinates()}
+    try:
+        coordinator.tc_control.set_temps() # Updates the lid and the block temperatures with a single round of serial commands
+        telemetry["lid"] = coordinator.tc_control.lid_temp
+        telemetry["block"] = coordinator.tc_control.temperature
+    except AttributeError:
+        telemetry["lid"] = telemetry["block"] = NOT_CONNECTED
     if RUNNING_APP_FOR_REAL:
-        coordinator.check_tempdeck_status()
-        status = coordinator.check_tempdeck_status()
-        socketio.emit("check_tempdeck_status", status)
+        telemetry["tempdeck"] = coordinator.get_tempdeck_temp()
+        telemetry["tempdeck_status"] = coordinator.check_tempdeck_status()
     else:
-        socketio.emit("check_tempdeck_status", "Not connected")
+        telemetry["tempdeck"] = telemetry["tempdeck_status"] = NOT_CONNECTED
+    emit("telemetry", telemetry) # Only the page that asked needs the answer
     
 #----------------------------------------------- CALIBRATION EVENTS SECTION
 
@@ -500,29 +625,58 @@ def calibration_parameters(component_information):
     componentToCalibrate.append(component_information[0]) # Type of component: either "c" or "p" for chip and plate. respectively
     componentToCalibrate.append(component_information[1]) # Component model
 
+# A calibration captures NUMBER_OF_CALIBRATION_POINTS points, one per capture_calibration_point event (the capture button of the page) or every time
+# manual control is ended with the joystick. The handlers only update this state, no handler waits for the whole calibration
+calibration_state = {"active": False, "next_point": 0} # Whether a calibration is in progress and the index of the next point to be captured
+calibration_lock = threading.Lock() # Protects calibration_state, points can be captured from the page and the joystick at the same time
+
 @socketio.on("start_calibration")
 def start_calibration():
-    deactivate_done_calibration_flag()
     socketio.emit("component_being_calibrated", componentToCalibrate) # Send the component being calibrated
-    calibration_points = []
-    while not read_done_calibration_flag():
-        # Enable manual control
+    with calibration_lock:
+        coordinator.reset_calibration_points()
+        calibration_state["active"] = True
+        calibration_state["next_point"] = 0
+    socketio.start_background_task(run_calibration_manual_control)
+
+@socketio.on("capture_calibration_point")
+def capture_calibration_point():
+    coordinator.ot_control.wait_for_commands() # Let the joystick moves that are still queued finish before reading the position
+    coordinator.invalidate_coordinates_cache()
+    store_calibration_point()
+
+# Keeps manual control enabled while the calibration is in progress. Every time the user ends manual control with the joystick, the position is captured
+def run_calibration_manual_control():
+    try:
+        coordinator.myController
+    except AttributeError:
+        return # No joystick, the points can only be captured from the page
+    while calibration_in_progress():
         coordinator.manual_control()
-        print("Calibration point added")
-        # Once manual control is over (user pressed START button), read the position of the syringe
+        store_calibration_point() # Does nothing if manual control ended because the calibration was stopped or completed
+
+def calibration_in_progress():
+    with calibration_lock:
+        return calibration_state["active"]
+
+# Stores the position of the syringe as the next calibration point and sends it to the user. The last point ends the calibration and sends the
+# list with all of the points
+def store_calibration_point():
+    with calibration_lock:
+        if not calibration_state["active"]:
+            return
         position = coordinator.get_current_coordinates()
-        # Store the position in the calibration points list
-        calibration_points.append(position)
-        # Send feedback to user
-        socketio.emit("feedback_calibration_point", [ position[X], position[Y], position[Z] ] )
-        # Check if all the calibration points have been collected
-        if (len(calibration_points) == NUMBER_OF_CALIBRATION_POINTS):
-            activate_done_calibration_flag()
-
-    # Checking again, bc the flag could've been deactivated when exiting calibration (pressing home button or other) before finishing the calibration
-    if (len(calibration_points) == NUMBER_OF_CALIBRATION_POINTS):
+        coordinator.store_calibration_point(calibration_state["next_point"], position)
+        calibration_state["next_point"] += 1
+        complete = coordinator.calibration_points_complete()
+        calibration_state["active"] = not complete
+    print("Calibration point added")
+    # Send feedback to user
+    socketio.emit("feedback_calibration_point", [ position[X], position[Y], position[Z] ] )
+    if complete:
+        coordinator.stop_manual_control() # In case the last point was captured from the page while the joystick was being listened to
         # Send an event with the calibration points list
-        socketio.emit("stored_calibration_points", calibration_points)
+        socketio.emit("stored_calibration_points", coordinator.get_calibration_points())
 
 @socketio.on("start_calibration_load")
 def start_calibration_load():
@@ -564,7 +718,8 @@ def stop_calibration():
     stop_sending_coordinates()
     myCamera.stop()
     my_Pippete_Camera.stop()
-    activate_done_calibration_flag()
+    with calibration_lock:
+        calibration_state["active"] = False
     coordinator.stop_manual_control()
 
 #----------------------------------------------- LABWARE EVENTS SECTION
@@ -629,8 +784,9 @@ def get_current_labware():
 
 @socketio.on("delete_current_labware")
 def delete_current_labware():
-    coordinator.myLabware.chip_list.clear()
-    coordinator.myLabware.plate_list.clear()
+    coordinator.myLabware.reset_chip_list()
+    coordinator.myLabware.reset_plate_list()
+    coordinator.refresh_slot_to_properties()
 
 @socketio.on("delete_labware")
 def delete_labware(command):
@@ -656,16 +812,17 @@ def available_saved_labware():
     files_list = coordinator.get_available_labware_setup_files()
     socketio.emit("saved_labware_files", files_list)
 
+NEW_MODEL_CREATORS = { # component_type sent by the labware creation page -> method of the coordinator that saves the new model
+    "Chip": coordinator.create_new_chip_model,
+    "Plate": coordinator.create_new_plate_model,
+    "Syringe": coordinator.create_new_syringe_model,
+}
+
 @socketio.on("new_labware_model")
 def new_labware_model(model_properties):
-    if (model_properties["component_type"] == "Chip"):
-        coordinator.create_new_chip_model(model_properties)
-
-    elif (model_properties["component_type"] == "Plate"):
-        coordinator.create_new_plate_model(model_properties)
-
-    elif (model_properties["component_type"] == "Syringe"):
-        coordinator.create_new_syringe_model(model_properties)
+    create_new_model = NEW_MODEL_CREATORS.get(model_properties["component_type"])
+    if create_new_model is not None:
+        create_new_model(model_properties)
 
 @socketio.on("get_type_of_labware_by_slot")
 def get_type_of_labware_by_slot(slot):
@@ -691,25 +848,21 @@ def get_syringe_models():
 
 #----------------------------------------------- INSTANTANEOUS COMMANDS EVENTS SECTION
 
+INSTANT_COMMAND_DESTINATIONS = { # Type of labware of the instant command -> method of the coordinator that moves to one of its wells/pots
+    LABWARE_CHIP: coordinator.go_to_well,
+    LABWARE_PLATE: coordinator.go_to_pot,
+}
+
 @socketio.on("instant_command")
 def execute_instant_command(command_description):
     # Here goes the App.whatever that sends an instantaneous command to the OT_CONTROL object -> "INSTANTANEOUS COMMANDS" section of Application class
-    if(command_description[0] == "c"):
-        chip = int(command_description[1])
-        well_nickname = command_description[2]
-        coordinator.go_to_well(chip, well_nickname)
-
-    else:
-        plate = int(command_description[1])
-        pot_nickname = command_description[2]
-        coordinator.go_to_pot(plate, pot_nickname)
+    go_to_destination = INSTANT_COMMAND_DESTINATIONS.get(command_description[LABWARE_COMPONENT_INDEX], coordinator.go_to_pot) # Anything that isn't a chip is a plate
+    labware_number = int(command_description[1])
+    nickname = command_description[2]
+    go_to_destination(labware_number, nickname)
 
 @socketio.on("get_labware_summary")
 def get_labware_summary():
-    full_labware_dict =  coordinator.get_full_current_labware()
-    labware_summary = dict()
-    labware_summary["chips"] = list()
-    labware_summary["plates"] = list()
     """
     labware_summary format
         labware_summary = {
@@ -733,18 +886,7 @@ def get_labware_summary():
             "nicknames": [nickname_1, nickname_2, ... , nickname_n] # Like A3, B5, C11, etc.
         }
     """
-    for chip_properties in full_labware_dict["chips"]:
-        summary = dict()
-        summary["model"] = chip_properties["model"]
-        summary["nicknames"] = chip_properties["well_nicknames"]
-        labware_summary["chips"].append(summary)
-
-    for plate_properties in full_labware_dict["plates"]:
-        summary = dict()
-        summary["model"] = plate_properties["model"]
-        summary["nicknames"] = plate_properties["pot_nicknames"]
-        labware_summary["plates"].append(summary)
-    socketio.emit("labware_summary", labware_summary)
+    socketio.emit("labware_summary", coordinator.get_labware_summary()) # Only rebuilt by the coordinator when the labware changed
 
 @socketio.on("go_to_deck_slot")
 def go_to_deck_slot(slot):
@@ -755,40 +897,13 @@ def go_to_deck_slot(slot):
 def rename_deck_slot():
     print("The button has been pressed")
 
-@socketio.on("home_X")
-def home_X():
-    # print("home X")
-    coordinator.ot_control.home('X')
-
-@socketio.on("home_Y")
-def home_Y():
-    # print("home Y")
-    coordinator.ot_control.home('Y')
-
-@socketio.on("home_all_motors")
-def home_all_motors():
-    # print("home All")
-    coordinator.ot_control.home()
-
-@socketio.on("home_Z")
-def home_Z():
-    # print("home Z")
-    coordinator.ot_control.home('Z')
-
-@socketio.on("home_A")
-def home_A():
-    # print("home A")
-    coordinator.ot_control.home('A')
-
-@socketio.on("home_B")
-def home_B():
-    # print("home B")
-    coordinator.ot_control.home('B')
-
-@socketio.on("home_C")
-def home_C():
-    # print("home C")
-    coordinator.ot_control.home('C')
+# Homes a single axis ('X', 'Y', 'Z', 'A', 'B' or 'C') or every axis if it receives HOME_ALL_AXES
+@socketio.on("home_axis")
+def home_axis(axis):
+    if axis == HOME_ALL_AXES:
+        coordinator.ot_control.home()
+    else:
+        coordinator.ot_control.home(axis)
 
 @socketio.on("connect_all")
 def connect_all():
@@ -819,11 +934,7 @@ def run_protocol(protocol_name):
 
 @socketio.on("get_available_protocols")
 def get_available_protocols():
-    if os.name == WINDOWS_OS:
-        path_to_protocol = RELATIVE_PATH_TO_PROTOCOLS_W  # moves to script folder
-    elif os.name == LINUX_OS:
-        path_to_protocol = RELATIVE_PATH_TO_PROTOCOLS_L  # moves to script folder
-    list = os.listdir(path_to_protocol) # make a list of scripts in folder
+    list = list_files(PROTOCOLS_DIR) # make a list of scripts in folder (only read again from disk when the folder changes)
     socketio.emit("protocols_available", list) # send the list back to js
 
 @socketio.on("set_protocol_filename")
@@ -841,24 +952,14 @@ def set_protocol_filename(protocol_name):
     if name_of_calibration_file == None or name_of_calibration_file == 'None set':
         pass
     else:
-        coordinator.myLabware.chip_list.clear()
-        coordinator.myLabware.plate_list.clear()
+        coordinator.myLabware.reset_chip_list()
+        coordinator.myLabware.reset_plate_list()
         print(f"Loading labware")
         coordinator.load_labware_setup(name_of_calibration_file)
     socketio.emit("protocol_python_labware", name_of_calibration_file)
     socketio.emit("protocol_python_author", author)
     socketio.emit("protocol_python_description", description)
 
-@socketio.on("display_contents")
-def display_contents():
-    try:
-        list_of_contents= executer.info_from_protocol()[0] # 1) list_of_lines 2)Name of calibration file used. 
-        socketio.emit("protocol_python_data", list_of_contents)
-    except TypeError:
-        print(f"WARNING: The filename might be the wrong extension. This error has been raised in display contents. ")
-    except FileNotFoundError:
-        print("WARNING: File not found on folder. ")
-
 @socketio.on("stop_protocol")
 def stop_protocol():
     executer.stop_execution()
@@ -875,11 +976,7 @@ def continue_protocol():
 
 @socketio.on("get_available_calibrations")
 def get_available_calibrations():
-    if os.name == WINDOWS_OS:
-        path_to_calibration = RELATIVE_PATH_TO_LABWARE_W  # moves to script folder
-    elif os.name == LINUX_OS:
-        path_to_calibration = RELATIVE_PATH_TO_LABWARE_L  # moves to script folder
-    list = os.listdir(path_to_calibration) # make a list of scripts in folder
+    list = list_files(LABWARE_DIR) # make a list of scripts in folder (only read again from disk when the folder changes)
     socketio.emit("calibrations_available", list) # send the list back to js
 
 @socketio.on("set_labware_calibration")
@@ -892,11 +989,7 @@ def reconnect_coordinator():
 
 @socketio.on("get_available_syringes")
 def get_available_syringes():
-    if os.name == WINDOWS_OS:
-        path_to_calibration = RELATIVE_PATH_TO_SYRINGES_W  # moves to script folder
-    elif os.name == LINUX_OS:
-        path_to_calibration = RELATIVE_PATH_TO_SYRINGES_L  # moves to script folder
-    list = os.listdir(path_to_calibration) # make a list of scripts in folder
+    list = list_files(SYRINGES_DIR) # make a list of scripts in folder (only read again from disk when the folder changes)
     socketio.emit("syringes_available", list) # send the list back to js
 
 @socketio.on("set_labware_syringes")
@@ -921,17 +1014,18 @@ def run_script():
 
 @socketio.on("give_me_script_json")
 def give_me_script_json(scriptName):
-    # read file
-    path_to_script = "../scripts/" + scriptName # moves to script folder
-    with open(path_to_script, 'r') as myfile:
+    path_to_script = path_inside_folder(SCRIPTS_DIR, scriptName)
+    if path_to_script is None:
+        print(f"WARNING: '{scriptName}' is not a file of the scripts folder")
+        return
+    with open(path_to_script, 'rb') as myfile: # Read as bytes, there's no need to decode the text just to encode it again for the socket
         data = myfile.read()
 
-    socketio.emit("script_json_data", data) # send data back to js in a json string
+    socketio.emit("script_json_data", data) # send data back to js as a binary message (an ArrayBuffer with the json string)
 
 @socketio.on("get_available_scripts")
 def get_available_scripts():
-    path_to_scripts_folder = "../scripts" # path to folder
-    list = os.listdir(path_to_scripts_folder) # make a list of scripts in folder
+    list = os.listdir(SCRIPTS_DIR) # make a list of scripts in folder
     socketio.emit("scripts_available", list) # send the list back to js
 
 if __name__ == "__main__":